@@ -0,0 +1,47 @@
+# SPDX-FileCopyrightText: Copyright (c) 2022 tinkeringtech for TinkeringTech LLC
+#
+# SPDX-License-Identifier: Unlicense
+
+# Drives the Radio class against the software emulator of the rda5807m,
+# so it runs on a plain computer without any radio hardware.
+import time
+import tinkeringtech_rda5807m
+import tinkeringtech_rda5807m_emulator
+
+STATION = "TINKER  "
+TEXT = "Hello from the rda5807m emulator" + " " * 32
+
+# Station name (0B) and radio text (2A) groups broadcast on 99.5 MHz
+groups = []
+for seg in range(4):
+    block4 = (ord(STATION[2 * seg]) << 8) | ord(STATION[2 * seg + 1])
+    groups.append((0x54A8, 0x0800 | seg, 0x54A8, block4))
+for seg in range(16):
+    block3 = (ord(TEXT[4 * seg]) << 8) | ord(TEXT[4 * seg + 1])
+    block4 = (ord(TEXT[4 * seg + 2]) << 8) | ord(TEXT[4 * seg + 3])
+    groups.append((0x54A8, 0x2000 | seg, block3, block4))
+
+chip = tinkeringtech_rda5807m_emulator.RDA5807MEmulator(
+    stations={8930: 40, 9950: 30, 10110: 12}, rds={9950: groups}
+)
+
+rds = tinkeringtech_rda5807m.RDSParser()
+rds.attach_service_name_callback(lambda name: print("Station name:", name))
+rds.attach_text_callback(lambda text: print("Radio text:", text))
+
+radio = tinkeringtech_rda5807m.Radio(chip, rds, 9950, 3)
+print("Tuned to", radio.format_freq(), "in %.3f s" % radio.tune_latency)
+
+# Listen for a few seconds
+end = time.monotonic() + 4
+while time.monotonic() < end:
+    radio.check_rds()
+
+# Walk through the band
+for _ in range(3):
+    radio.seek_up()
+    print("Found", radio.format_freq(), "RSSI", radio.rssi)
+
+# Scan the whole band, strongest stations first
+for frequency, rssi, stereo, _ in radio.scan_band():
+    print("Station", frequency, "RSSI", rssi, "stereo" if stereo else "mono")
@@ -0,0 +1,103 @@
+# SPDX-FileCopyrightText: Copyright (c) 2022 tinkeringtech for TinkeringTech LLC
+#
+# SPDX-License-Identifier: Unlicense
+
+# Feeds synthetic RDS groups through RDSParser.process_data and reports the
+# decoding rate and heap use. Needs no radio hardware, runs on CircuitPython
+# and CPython.
+import gc
+import time
+import tinkeringtech_rda5807m
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+GROUPS = 5000
+# A station sends a group every ~88 ms, decoding must stay far below that
+MIN_GROUPS_PER_SECOND = 100
+# Room for the integers CPython boxes while looping and decoding - in bytes
+MAX_TEMPORARY_BYTES = 1024
+
+PI_CODE = 0x54A8
+STATION = "TINKER  "
+TEXT = "Tinkeringtech RDS benchmark - synthetic RadioText for the parser "
+
+
+def make_groups():
+    # One cycle of PS (0B), RadioText (2A) and clock time (4A) groups
+    groups = []
+    for seg in range(4):
+        chars = STATION[2 * seg : 2 * seg + 2]
+        block4 = (ord(chars[0]) << 8) | ord(chars[1])
+        groups.append((PI_CODE, 0x0800 | seg, PI_CODE, block4))
+    for seg in range(16):
+        chars = TEXT[4 * seg : 4 * seg + 4]
+        block3 = (ord(chars[0]) << 8) | ord(chars[1])
+        block4 = (ord(chars[2]) << 8) | ord(chars[3])
+        groups.append((PI_CODE, 0x2000 | seg, block3, block4))
+    # 4A: 12:34 local time, no offset
+    groups.append((PI_CODE, 0x4000, 0x0000, (12 << 12) | (34 << 6)))
+    return groups
+
+
+def benchmark_speed(cycle):
+    rds = tinkeringtech_rda5807m.RDSParser()
+    rds.attach_service_name_callback(lambda name: None)
+    rds.attach_text_callback(lambda text: None)
+    rds.attach_time_callback(lambda hour, minute: None)
+
+    worst = 0
+    start = time.monotonic()
+    for n in range(GROUPS):
+        group = cycle[n % len(cycle)]
+        t = time.monotonic()
+        rds.process_data(group[0], group[1], group[2], group[3])
+        worst = max(worst, time.monotonic() - t)
+    elapsed = time.monotonic() - start
+
+    rate = GROUPS / elapsed
+    print("Decoded %d groups in %.3f s" % (GROUPS, elapsed))
+    print("Groups/second: %d" % rate)
+    print("Slowest group: %.2f ms" % (worst * 1000))
+    assert rate >= MIN_GROUPS_PER_SECOND, "RDS decoding too slow"
+
+
+def feed(rds, cycle):
+    for n in range(GROUPS):
+        group = cycle[n % len(cycle)]
+        rds.process_data(group[0], group[1], group[2], group[3])
+
+
+def benchmark_allocations(cycle):
+    # Without callbacks attached no group publishes, so decoding must not
+    # build any objects. CircuitPython frees nothing while gc is disabled, so
+    # the drop in free memory is everything allocated. CPython frees objects as
+    # soon as they are dropped, so the peak above the starting heap is checked
+    # instead, which any temporary string or list per group shows in.
+    rds = tinkeringtech_rda5807m.RDSParser()
+    feed(rds, cycle)  # Warm up
+    gc.collect()
+    if tracemalloc:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        feed(rds, cycle)
+        used = tracemalloc.get_traced_memory()[1] - before
+        tracemalloc.stop()
+        print("Peak heap bytes while decoding: %d" % used)
+        assert used <= MAX_TEMPORARY_BYTES, "RDS decoding allocated memory"
+    else:
+        gc.disable()
+        before = gc.mem_free()  # pylint: disable=no-member
+        feed(rds, cycle)
+        used = before - gc.mem_free()  # pylint: disable=no-member
+        gc.enable()
+        print("Heap bytes per group: %.2f" % (used / GROUPS))
+        assert used < GROUPS, "RDS decoding allocated memory"
+
+
+group_cycle = make_groups()
+benchmark_speed(group_cycle)
+benchmark_allocations(group_cycle)
@@ -0,0 +1,222 @@
+# SPDX-FileCopyrightText: Copyright (c) 2022 tinkeringtech for TinkeringTech LLC
+#
+# SPDX-License-Identifier: Unlicense
+
+# Replays synthetic RDS broadcasts through Radio.check_rds against the chip
+# emulator and reports, for several group mixes and block error rates, the time
+# to the first station name and radio text, the decoding rate, heap use and I2C
+# transactions per group. Heap use is the peak in bytes on CPython ("peak B"),
+# which cannot count allocations, and the bytes allocated per group on
+# CircuitPython ("B/group"). Runs headless on CPython or CircuitPython, on a
+# simulated clock, so regressions show before flashing a device.
+import gc
+import random
+import time
+import tinkeringtech_rda5807m
+import tinkeringtech_rda5807m_emulator
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+FREQUENCY = 9950
+BROADCAST = 600  # Groups in the broadcast loop
+GROUPS = 2000  # Groups decoded for the rate and heap measurements
+TIMEOUT = 60  # Longest wait for the first station name and text - in seconds
+MIN_GROUPS_PER_SECOND = 100
+MAX_TRANSACTIONS_PER_GROUP = 2
+# Room for the integers and floats CPython boxes per poll, about 900 bytes
+# with most of it in the emulator, while a string rebuilt per group adds
+# several kB - in bytes
+MAX_TEMPORARY_BYTES = 2048
+
+PI_CODE = 0x54A8
+STATION = "TINKER  "
+TEXT = "Tinkeringtech receiver benchmark\r"
+
+# Group mixes: name, other groups sent between two station name groups
+# (None for no radio text at all) and filler groups (1A, 8A) per text segment
+MIXES = (
+    ("PS only", None, 0),
+    ("balanced", 1, 0),
+    ("text heavy", 4, 0),
+    ("busy", 2, 2),
+)
+ERROR_RATES = (0, 0.1, 0.3)
+
+
+def station_group(seg):
+    chars = STATION[2 * seg : 2 * seg + 2]
+    return (PI_CODE, 0x0800 | seg, PI_CODE, (ord(chars[0]) << 8) | ord(chars[1]))
+
+
+def text_groups():
+    # 2A groups up to the segment holding the end of text marker
+    text = TEXT + " " * (-len(TEXT) % 4)
+    groups = []
+    for seg in range(len(text) // 4):
+        chars = text[4 * seg : 4 * seg + 4]
+        block3 = (ord(chars[0]) << 8) | ord(chars[1])
+        block4 = (ord(chars[2]) << 8) | ord(chars[3])
+        groups.append((PI_CODE, 0x2000 | seg, block3, block4))
+    return groups
+
+
+def make_broadcast(ps_every, fillers, error_rate):
+    # Interleaves the groups of a mix, then flags a share of them with BLERB
+    # 2 or 3 and garbles their block D, as a noisy reception would
+    others = []
+    if ps_every is not None:
+        for group in text_groups():
+            others.append(group)
+            for _ in range(fillers):
+                others.append((PI_CODE, 0x1000, 0x0000, 0x1234))
+                others.append((PI_CODE, 0x8000, 0x0000, 0x0000))
+    groups = []
+    ps_seg = 0
+    other = 0
+    while len(groups) < BROADCAST:
+        groups.append(station_group(ps_seg))
+        ps_seg = (ps_seg + 1) % 4
+        for _ in range(ps_every or 0):
+            groups.append(others[other % len(others)])
+            other += 1
+    random.seed(1)
+    broadcast = []
+    for block1, block2, block3, block4 in groups[:BROADCAST]:
+        if random.random() < error_rate:
+            bler = random.randint(2, 3)
+            block4 ^= random.randint(1, 0xFFFF)
+        else:
+            bler = 0
+        broadcast.append((block1, block2, block3, block4, bler))
+    return broadcast
+
+
+class FirstSeen:
+    # Remembers when the station name and radio text were first published
+    def __init__(self, clock):
+        self.clock = clock
+        self.name = None
+        self.text = None
+
+    def on_name(self, _name):
+        if self.name is None:
+            self.name = self.clock.now
+
+    def on_text(self, _text):
+        if self.text is None:
+            self.text = self.clock.now
+
+
+def receive(radio, clock, groups):
+    # Polls the chip once per RDS group period
+    for _ in range(groups):
+        clock.sleep(radio.board.rds_group_time)
+        radio.check_rds()
+
+
+def heap_used(radio, clock):
+    # CircuitPython frees nothing while gc is disabled, so the drop in free
+    # memory is everything allocated, reported per group. CPython frees objects
+    # as soon as they are dropped, so the peak above the starting heap is
+    # reported instead, which any temporary object per group shows in.
+    gc.collect()
+    if tracemalloc:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        receive(radio, clock, GROUPS)
+        used = tracemalloc.get_traced_memory()[1] - before
+        tracemalloc.stop()
+        assert used <= MAX_TEMPORARY_BYTES, "RDS reception allocated memory"
+        return used
+    gc.disable()
+    before = gc.mem_free()  # pylint: disable=no-member
+    receive(radio, clock, GROUPS)
+    used = before - gc.mem_free()  # pylint: disable=no-member
+    gc.enable()
+    assert used < GROUPS, "RDS reception allocated memory"
+    return used / GROUPS
+
+
+def time_to_first(radio, clock, first, text):
+    # Time to first station name and radio text, in simulated seconds
+    tuned = clock.now
+    while clock.now - tuned < TIMEOUT:
+        if first.name is not None and (first.text is not None or not text):
+            break
+        clock.sleep(0.01)
+        radio.check_rds()
+    ttf_ps = None if first.name is None else first.name - tuned
+    ttf_rt = None if first.text is None else first.text - tuned
+    return ttf_ps, ttf_rt
+
+
+def decoding_rate(radio, clock):
+    # Groups decoded per second and I2C transactions per group
+    chip = radio.board
+    rds = radio.rds_parser
+    transactions = chip.transactions
+    decoded = rds.groups_accepted + rds.groups_rejected
+    start = time.monotonic()
+    receive(radio, clock, GROUPS)
+    elapsed = time.monotonic() - start
+    decoded = rds.groups_accepted + rds.groups_rejected - decoded
+    rate = decoded / elapsed if elapsed else float("inf")
+    return rate, (chip.transactions - transactions) / decoded
+
+
+def seconds(value):
+    return "-" if value is None else "%.2f" % value
+
+
+def run(mix, error_rate):
+    name, ps_every, fillers = mix
+    clock = tinkeringtech_rda5807m.VirtualClock()
+    chip = tinkeringtech_rda5807m_emulator.RDA5807MEmulator(
+        stations={FREQUENCY: 40},
+        rds={FREQUENCY: make_broadcast(ps_every, fillers, error_rate)},
+        clock=clock,
+    )
+    rds = tinkeringtech_rda5807m.RDSParser()
+    first = FirstSeen(clock)
+    rds.attach_service_name_callback(first.on_name)
+    rds.attach_text_callback(first.on_text)
+    radio = tinkeringtech_rda5807m.Radio(
+        chip, rds, FREQUENCY, sequential=chip.sequential, clock=clock
+    )
+
+    ttf_ps, ttf_rt = time_to_first(radio, clock, first, ps_every is not None)
+    rate, per_group = decoding_rate(radio, clock)
+
+    # Heap use, without callbacks so that nothing is published
+    rds.attach_service_name_callback(None)
+    rds.attach_text_callback(None)
+    used = heap_used(radio, clock)
+
+    print(
+        "%-10s %4d%% %7s %7s %9d %8.1f %8.2f"
+        % (
+            name,
+            error_rate * 100,
+            seconds(ttf_ps),
+            seconds(ttf_rt),
+            rate,
+            used,
+            per_group,
+        )
+    )
+    assert rate >= MIN_GROUPS_PER_SECOND, "RDS decoding too slow"
+    assert per_group <= MAX_TRANSACTIONS_PER_GROUP, "Too many I2C transactions"
+    if not error_rate:
+        assert ttf_ps is not None, "No station name without errors"
+        assert ttf_rt is not None or ps_every is None, "No radio text without errors"
+
+
+HEAP = "peak B" if tracemalloc else "B/group"
+print("mix        errors  PS (s)  RT (s)  groups/s  %7s  i2c/gr" % HEAP)
+for group_mix in MIXES:
+    for rate_of_errors in ERROR_RATES:
+        run(group_mix, rate_of_errors)
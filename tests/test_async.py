@@ -0,0 +1,67 @@
+# SPDX-FileCopyrightText: Copyright (c) 2022 tinkeringtech for TinkeringTech LLC
+#
+# SPDX-License-Identifier: MIT
+
+import asyncio
+import tinkeringtech_rda5807m
+from tinkeringtech_rda5807m_emulator import RDA5807MEmulator
+
+GROUP = (0x54A8, 0x0800, 0x54A8, 0x4142)
+
+
+def make_radio():
+    # Real time clock, with the chip sped up to keep the tests short
+    chip = RDA5807MEmulator(stations={8930: 40, 9950: 30}, rds={9950: [GROUP]})
+    chip.tune_time = chip.seek_step_time = 0.001
+    chip.rds_group_time = 0.005
+    radio = tinkeringtech_rda5807m.Radio(
+        chip, tinkeringtech_rda5807m.RDSParser(), 9950, sequential=chip.sequential
+    )
+    return tinkeringtech_rda5807m.AsyncRadio(radio)
+
+
+async def count_ticks(ticks, done):
+    # Runs beside the radio to show it does not block the event loop
+    while not done.is_set():
+        ticks.append(None)
+        await asyncio.sleep(0)
+
+
+async def run_beside_ticker(coroutine):
+    ticks = []
+    done = asyncio.Event()
+    ticker = asyncio.ensure_future(count_ticks(ticks, done))
+    result = await coroutine
+    done.set()
+    await ticker
+    return result, len(ticks)
+
+
+def test_tune():
+    radio = make_radio()
+    latency, ticks = asyncio.run(run_beside_ticker(radio.tune(8930)))
+    assert latency is not None
+    assert radio.radio.frequency == 8930
+    assert ticks > 1
+
+
+def test_seek():
+    radio = make_radio()
+    result, ticks = asyncio.run(run_beside_ticker(radio.seek(upward=False)))
+    assert result == (8930, 40)
+    assert ticks > 1
+
+
+async def first_groups(radio, count):
+    groups = []
+    async for group in radio.rds_groups(interval=0.001):
+        groups.append(group)
+        if len(groups) == count:
+            return groups
+    return groups
+
+
+def test_rds_groups():
+    radio = make_radio()
+    groups = asyncio.run(asyncio.wait_for(first_groups(radio, 1), 5))
+    assert groups == [GROUP + (0,)]
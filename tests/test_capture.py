@@ -0,0 +1,102 @@
+# SPDX-FileCopyrightText: Copyright (c) 2022 tinkeringtech for TinkeringTech LLC
+#
+# SPDX-License-Identifier: MIT
+
+import io
+import struct
+import pytest
+import tinkeringtech_rda5807m as rda
+from tinkeringtech_rda5807m_emulator import RDA5807MEmulator
+
+FREQUENCY = 9950
+PI_CODE = 0x54A8
+GROUPS = [(PI_CODE, 0x0800 | seg, PI_CODE, 0x4141 + seg, seg & 1) for seg in range(4)]
+
+
+def capture(groups=100):
+    clock = rda.VirtualClock()
+    chip = RDA5807MEmulator(
+        stations={FREQUENCY: 40}, rds={FREQUENCY: GROUPS}, clock=clock
+    )
+    radio = rda.Radio(
+        chip, rda.RDSParser(), FREQUENCY, sequential=chip.sequential, clock=clock
+    )
+    received = []
+    radio.send_rds = lambda *group: received.append(group)
+    stream = io.BytesIO()
+    radio.start_capture(stream)
+    while len(received) < groups:
+        clock.sleep(chip.rds_group_time)
+        radio.check_rds()
+    radio.stop_capture()
+    radio.check_rds()
+    return stream.getvalue(), received, chip
+
+
+def test_capture_records():
+    data, received, chip = capture(8)
+    assert len(data) == 8 * rda.CAPTURE_RECORD_SIZE
+    record = struct.unpack_from(rda.CAPTURE_RECORD_FORMAT, data, 0)
+    assert record[1:3] == (FREQUENCY, 40)
+    assert record[3] == received[0][4]
+    assert record[4:] == received[0][:4]
+    last = struct.unpack_from(rda.CAPTURE_RECORD_FORMAT, data, len(data) - 16)
+    assert last[0] >= 7000 * chip.rds_group_time
+
+
+def test_replay_bytes():
+    data, received, _ = capture()
+    replayed = []
+    count = rda.replay_capture(data, lambda *group: replayed.append(group))
+    assert count == len(received) == 100
+    assert replayed == received
+
+
+def test_replay_file():
+    data, received, _ = capture()
+    replayed = []
+    count = rda.replay_capture(io.BytesIO(data), lambda *group: replayed.append(group))
+    assert count == 100
+    assert replayed == received
+
+
+def test_replay_realtime():
+    data, _, chip = capture(10)
+    clock = rda.VirtualClock()
+    rda.replay_capture(data, lambda *group: None, realtime=True, clock=clock)
+    assert abs(clock.now - 9 * chip.rds_group_time) < 2 * chip.rds_group_time
+
+
+def test_replay_into_parser():
+    data, _, _ = capture(16)
+    rds = rda.RDSParser()
+    rda.replay_capture(data, rds.process_data)
+    assert rds.groups_accepted == 16
+    assert rds.program_service_name == "AAABACAD"
+
+
+class ShortReads(io.RawIOBase):
+    # A stream that never returns more than size bytes per read
+    def __init__(self, data, size):
+        super().__init__()
+        self.data = io.BytesIO(data)
+        self.size = size
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        chunk = self.data.read(min(self.size, len(buffer)))
+        buffer[: len(chunk)] = chunk
+        return len(chunk)
+
+
+@pytest.mark.parametrize("size", [1, 7, 17, 1000])
+def test_replay_short_reads(size):
+    data, received, _ = capture()
+    replayed = []
+    count = rda.replay_capture(
+        ShortReads(data, size), lambda *group: replayed.append(group)
+    )
+    assert count == 100
+    assert replayed == received
@@ -0,0 +1,69 @@
+# SPDX-FileCopyrightText: Copyright (c) 2022 tinkeringtech for TinkeringTech LLC
+#
+# SPDX-License-Identifier: MIT
+
+import tinkeringtech_rda5807m as rda
+from tinkeringtech_rda5807m_emulator import RDA5807MEmulator
+
+ENABLE = rda.RADIO_REG_CTRL_ENABLE | rda.RADIO_REG_CTRL_RDS
+GROUP = (0x54A8, 0x0800, 0x54A8, 0x4142)
+
+
+def write(chip, reg, *values):
+    buf = bytearray([reg])
+    for value in values:
+        buf += bytes([value >> 8, value & 0xFF])
+    chip.write(buf)
+
+
+def read(chip, reg, count=1):
+    buf = bytearray(2 * count)
+    chip.write_then_readinto(bytes([reg]), buf)
+    return [(buf[i] << 8) | buf[i + 1] for i in range(0, len(buf), 2)]
+
+
+def tune(chip, channel):
+    write(chip, rda.RADIO_REG_CTRL, ENABLE)
+    write(chip, rda.RADIO_REG_CHAN, rda.RADIO_REG_CHAN_TUNE | channel << 6)
+
+
+def test_chip_id():
+    chip = RDA5807MEmulator()
+    assert read(chip, rda.RADIO_REG_CHIPID) == [0x5804]
+
+
+def test_tune_sets_stc():
+    clock = rda.VirtualClock()
+    chip = RDA5807MEmulator(stations={9950: 30}, clock=clock)
+    tune(chip, (99500 - 87000) // 100)
+    assert not read(chip, rda.RADIO_REG_RA)[0] & rda.RADIO_REG_RA_STC
+    assert not read(chip, rda.RADIO_REG_CHAN)[0] & rda.RADIO_REG_CHAN_TUNE
+    clock.sleep(chip.tune_time)
+    reg_a, reg_b = read(chip, rda.RADIO_REG_RA, 2)
+    assert reg_a & rda.RADIO_REG_RA_STC
+    assert reg_a & rda.RADIO_REG_RA_NR == 125
+    assert reg_b >> 10 == 30
+    assert reg_b & rda.RADIO_REG_RB_FMTRUE
+
+
+def test_rdsd_read_consumes_group():
+    clock = rda.VirtualClock()
+    chip = RDA5807MEmulator(stations={9950: 30}, rds={9950: [GROUP]}, clock=clock)
+    tune(chip, 125)
+    clock.sleep(chip.tune_time + 2 * chip.rds_group_time)
+    values = read(chip, rda.RADIO_REG_RA, 6)
+    assert values[0] & rda.RADIO_REG_RA_RDS
+    assert tuple(values[2:]) == GROUP
+    assert not read(chip, rda.RADIO_REG_RA)[0] & rda.RADIO_REG_RA_RDS
+    assert chip.groups_read == 1
+
+
+def test_sequential_port():
+    chip = RDA5807MEmulator()
+    chip.sequential.write(bytes([0xC0, 0x01, 0x00, 0x00, 0x00, 0x00, 0x88, 0x8B]))
+    assert read(chip, rda.RADIO_REG_VOL) == [0x888B]
+    buf = bytearray(4)
+    chip.sequential.readinto(buf)
+    assert (buf[2] << 8 | buf[3]) >> 10 == chip.noise_floor
+    assert buf[3] & rda.RADIO_REG_RB_FMREADY
+    assert chip.transactions == 3
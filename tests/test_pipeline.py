@@ -0,0 +1,66 @@
+# SPDX-FileCopyrightText: Copyright (c) 2022 tinkeringtech for TinkeringTech LLC
+#
+# SPDX-License-Identifier: MIT
+
+import itertools
+import tinkeringtech_rda5807m as rda
+from tinkeringtech_rda5807m_emulator import RDA5807MEmulator
+
+PI_CODE = 0x54A8
+PTY = 10
+STATION = "TINKER  "
+# 4A group for 12:34 UTC, without local offset
+TIME_GROUP = (PI_CODE, 0x4000 | PTY << 5, 0x0000, 12 << 12 | 34 << 6, 0)
+
+
+def station_groups(pty=PTY):
+    groups = []
+    for seg in range(4):
+        block4 = (ord(STATION[2 * seg]) << 8) | ord(STATION[2 * seg + 1])
+        groups.append((PI_CODE, 0x0800 | pty << 5 | seg, PI_CODE, block4, 0))
+    return groups
+
+
+def kinds_of(events):
+    return [event.kind for event in events]
+
+
+def test_decode_groups():
+    groups = station_groups() * 2 + [TIME_GROUP] * 2
+    events = list(rda.decode_groups(groups))
+    assert kinds_of(events) == [rda.EVENT_PI, rda.EVENT_PTY, rda.EVENT_PS, rda.EVENT_CT]
+    assert [event.value for event in events] == [PI_CODE, PTY, STATION, (12, 34)]
+
+
+def test_decode_groups_kinds():
+    groups = station_groups() * 2 + [TIME_GROUP] * 2
+    events = list(rda.decode_groups(groups, rda.EVENT_CT | rda.EVENT_PTY))
+    assert kinds_of(events) == [rda.EVENT_PTY, rda.EVENT_CT]
+    assert events[1].value == (12, 34)
+
+
+def test_decode_groups_pty_change():
+    groups = station_groups() + station_groups(pty=3)
+    events = list(rda.decode_groups(groups, rda.EVENT_PTY))
+    assert [event.value for event in events] == [PTY, 3]
+
+
+def test_dedup_groups():
+    group = station_groups()[0]
+    groups = [group, group, (0, 0, 0, 0, 0), group[:4] + (2,), TIME_GROUP, group]
+    assert list(rda.dedup_groups(groups)) == [group, TIME_GROUP, group]
+
+
+def test_rds_group_source():
+    clock = rda.VirtualClock()
+    chip = RDA5807MEmulator(
+        stations={9950: 40}, rds={9950: station_groups()}, clock=clock
+    )
+    radio = rda.Radio(
+        chip, rda.RDSParser(), 9950, sequential=chip.sequential, clock=clock
+    )
+    source = rda.rds_group_source(radio)
+    events = rda.decode_groups(rda.dedup_groups(source), rda.EVENT_PS)
+    assert next(events).value == STATION
+    assert clock.now < 20 * chip.rds_group_time
+    assert sorted(itertools.islice(source, 4)) == station_groups()
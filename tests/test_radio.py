@@ -0,0 +1,337 @@
+# SPDX-FileCopyrightText: Copyright (c) 2022 tinkeringtech for TinkeringTech LLC
+#
+# SPDX-License-Identifier: MIT
+
+import pytest
+import tinkeringtech_rda5807m
+from tinkeringtech_rda5807m_emulator import RDA5807MEmulator
+
+STATIONS = {8930: 40, 9950: 30, 10110: 12}
+
+
+def make_radio(frequency=9950, **kwargs):
+    clock = tinkeringtech_rda5807m.VirtualClock()
+    chip = RDA5807MEmulator(stations=dict(STATIONS), clock=clock, **kwargs)
+    rds = tinkeringtech_rda5807m.RDSParser()
+    radio = tinkeringtech_rda5807m.Radio(
+        chip, rds, frequency, sequential=chip.sequential, clock=clock
+    )
+    return radio, chip
+
+
+def test_tune():
+    radio, chip = make_radio()
+    assert radio.frequency == 9950
+    assert radio.tune_latency == pytest.approx(chip.tune_time, abs=0.01)
+    radio.set_freq(8930)
+    assert radio.get_freq() == 8930
+    assert radio.get_rssi() == STATIONS[8930]
+
+
+def test_tune_clamps_to_band():
+    radio, _ = make_radio()
+    radio.set_freq(12000)
+    assert radio.get_freq() == radio.freq_high
+
+
+def test_tune_timeout():
+    radio, chip = make_radio()
+    chip.tune_time = 2 * radio.tune_timeout
+    assert radio.set_freq(8930) is None
+    assert radio.tune_latency is None
+    assert radio.clock.now < 2 * radio.tune_timeout
+
+
+def test_setup_keeps_power_on_r4():
+    # De-emphasis 50 us and AFC disabled, as a chip could come up with
+    power_on = tinkeringtech_rda5807m.RADIO_REG_R4_EM50 | 0x0100
+    clock = tinkeringtech_rda5807m.VirtualClock()
+    chip = RDA5807MEmulator(stations=dict(STATIONS), clock=clock)
+    chip.reset_values = dict(chip.reset_values)
+    chip.reset_values[tinkeringtech_rda5807m.RADIO_REG_R4] = power_on
+    radio = tinkeringtech_rda5807m.Radio(
+        chip,
+        tinkeringtech_rda5807m.RDSParser(),
+        9950,
+        sequential=chip.sequential,
+        clock=clock,
+    )
+    with radio.batch():
+        radio.set_mute(True)
+        radio.set_volume(5)
+    assert chip.registers[tinkeringtech_rda5807m.RADIO_REG_R4] == power_on
+    radio.set_soft_mute(True)
+    assert chip.registers[tinkeringtech_rda5807m.RADIO_REG_R4] == (
+        power_on | tinkeringtech_rda5807m.RADIO_REG_R4_SOFTMUTE
+    )
+
+
+def test_seek():
+    radio, _ = make_radio(8800)
+    assert radio.seek_up() == 8930
+    assert radio.seek_up() == 9950
+    assert radio.seek_down() == 8930
+
+
+def test_start_seek():
+    radio, _ = make_radio(9950)
+    seek = radio.start_seek()
+    assert seek.result() is None
+    while not seek.poll():
+        radio.clock.sleep(radio.poll_interval)
+    assert seek.result() == (10110, STATIONS[10110])
+    assert not seek.failed
+
+
+def test_seek_cancel():
+    radio, chip = make_radio(8800)
+    seek = radio.start_seek()
+    radio.clock.sleep(3 * chip.seek_step_time)
+    seek.cancel()
+    assert seek.is_done()
+    assert seek.cancelled
+    assert 8800 < radio.get_freq() < 8930
+
+
+def test_seek_fails_on_empty_band():
+    radio, chip = make_radio()
+    chip.stations = {}
+    seek = radio.start_seek(upward=False)
+    while not seek.poll():
+        radio.clock.sleep(radio.poll_interval)
+    assert seek.failed
+
+
+def test_scan_band():
+    radio, _ = make_radio(9950)
+    stations = radio.scan_band()
+    assert [station[:2] for station in stations] == [
+        (8930, 40),
+        (9950, 30),
+        (10110, 12),
+    ]
+    assert stations[0][2] and not stations[2][2]
+    assert all(station[3] for station in stations)
+    assert radio.get_freq() == 9950
+
+
+def test_sweep_spectrum():
+    radio, chip = make_radio(9950)
+    spectrum = list(radio.sweep_spectrum())
+    assert len(spectrum) == (radio.freq_high - radio.freq_low) // 10 + 1
+    assert spectrum[0][0] == radio.freq_low * 10
+    assert max(spectrum, key=lambda point: point[1]) == (89300, 40)
+    assert dict(spectrum)[89400] == 40 - chip.rolloff
+    assert radio.get_freq() == 9950
+
+
+def test_sweep_spectrum_into():
+    radio, _ = make_radio(9950)
+    buffer = bytearray(2000)
+    channels = radio.sweep_spectrum_into(buffer, spacing=50)
+    assert channels == (radio.freq_high - radio.freq_low) // 5 + 1
+    assert buffer[(89300 - radio.freq_low * 10) // 50] == 40
+    assert radio.spacing == 100
+    assert radio.get_freq() == 9950
+    assert radio.sweep_spectrum_into(bytearray(10)) == 10
+
+
+def test_band_too_wide_for_spacing():
+    radio, _ = make_radio()
+    radio.set_band("FMWORLD")
+    with pytest.raises(ValueError):
+        radio.set_spacing(25)
+    with pytest.raises(ValueError):
+        radio.sweep_spectrum_into(bytearray(2000), spacing=25)
+    assert radio.spacing == 100
+
+
+def test_batch():
+    radio, chip = make_radio()
+    transactions = chip.transactions
+    with radio.batch():
+        radio.set_mute(True)
+        radio.set_volume(5)
+        with radio.batch():
+            radio.set_bass_boost(True)
+        assert chip.transactions == transactions
+    assert chip.transactions == transactions + 1
+    assert chip.registers[tinkeringtech_rda5807m.RADIO_REG_VOL] & 0x0F == 5
+
+
+def test_unchanged_write_skipped():
+    radio, chip = make_radio()
+    radio.set_volume(5)
+    transactions = chip.transactions
+    radio.set_volume(5)
+    assert chip.transactions == transactions
+
+
+def make_group(count):
+    clock = tinkeringtech_rda5807m.VirtualClock()
+    radios = []
+    for _ in range(count):
+        chip = RDA5807MEmulator(stations=STATIONS, clock=clock)
+        radios.append(
+            tinkeringtech_rda5807m.Radio(
+                chip,
+                tinkeringtech_rda5807m.RDSParser(),
+                9950,
+                sequential=chip.sequential,
+                clock=clock,
+            )
+        )
+    return tinkeringtech_rda5807m.RadioGroup(radios), clock
+
+
+def test_radio_group_tune():
+    group, clock = make_group(3)
+    start = clock.now
+    latencies = group.tune([8930, 10110, 9000])
+    assert all(latency is not None for latency in latencies)
+    assert clock.now - start < 2 * RDA5807MEmulator.tune_time
+    assert [radio.frequency for radio in group.radios] == [8930, 10110, 9000]
+    assert [radio.rssi for radio in group.radios][:2] == [40, 12]
+    assert group.radios[0].registers is not group.radios[1].registers
+
+
+def test_radio_group_seek():
+    group, _ = make_group(2)
+    group.tune([8800, 9950])
+    assert group.seek() == [(8930, 40), (10110, 12)]
+
+
+def test_radio_group_scan_band():
+    group, _ = make_group(2)
+    single, _ = make_radio()
+    assert group.scan_band() == single.scan_band()
+    assert [radio.frequency for radio in group.radios] == [9950, 9950]
+
+
+def test_attach():
+    radio, chip = make_radio()
+    radio.set_freq(8930)
+    radio.set_volume(7)
+    radio.set_mono(True)
+    transactions = chip.transactions
+    attached = tinkeringtech_rda5807m.Radio(
+        chip,
+        tinkeringtech_rda5807m.RDSParser(),
+        10110,
+        sequential=chip.sequential,
+        clock=radio.clock,
+        attach=True,
+    )
+    assert chip.transactions == transactions + 1
+    assert (attached.frequency, attached.volume) == (8930, 7)
+    assert attached.mono and attached.tuned
+    assert attached.rssi == STATIONS[8930]
+    attached.set_volume(7)
+    assert chip.transactions == transactions + 1
+
+
+def test_attach_to_stopped_chip():
+    clock = tinkeringtech_rda5807m.VirtualClock()
+    chip = RDA5807MEmulator(stations=STATIONS, clock=clock)
+    radio = tinkeringtech_rda5807m.Radio(
+        chip,
+        tinkeringtech_rda5807m.RDSParser(),
+        10110,
+        sequential=chip.sequential,
+        clock=clock,
+        attach=True,
+    )
+    assert radio.get_freq() == 10110
+
+
+def test_snapshot():
+    radio, _ = make_radio()
+    radio.set_volume(7)
+    radio.set_freq(10110)
+    blob = radio.snapshot()
+    assert len(blob) == 12
+
+    other, chip = make_radio(8930)
+    chip.registers[6] = 0x1234
+    chip.registers[7] = 0x5678
+    other.restore(blob)
+    assert other.wait_tune(1)
+    assert other.get_freq() == 10110
+    assert other.volume == 7
+    assert other.snapshot() == blob
+    assert chip.registers[6:8] == [0x1234, 0x5678]
+
+
+@pytest.mark.parametrize("blob", [b"", bytes(12), b"\x01" + bytes(12)])
+def test_restore_rejects_bad_blob(blob):
+    radio, _ = make_radio()
+    with pytest.raises(ValueError):
+        radio.restore(blob)
+
+
+def poll_rds(radio, seconds):
+    end = radio.clock.now + seconds
+    while radio.clock.now < end:
+        radio.clock.sleep(0.05)
+        radio.check_rds()
+
+
+def test_rds_ready_hysteresis():
+    radio, chip = make_radio(10110)
+    assert radio.rds_ready
+    chip.stations[10110] = radio.rds_threshold - radio.rds_hysteresis // 2
+    poll_rds(radio, 5)
+    assert radio.rds_ready
+    chip.stations[10110] = radio.rds_threshold - radio.rds_hysteresis - 2
+    poll_rds(radio, 5)
+    assert not radio.rds_ready
+    chip.stations[10110] = radio.rds_threshold - 1
+    poll_rds(radio, 30)
+    assert not radio.rds_ready
+    chip.stations[10110] = radio.rds_threshold + 2
+    poll_rds(radio, 30)
+    assert radio.rds_ready
+
+
+def test_rssi_smoothing():
+    radio, chip = make_radio(10110)
+    chip.stations[10110] = 20
+    radio.check_rds()
+    assert radio.rssi == 20
+    assert STATIONS[10110] < radio.rssi_smoothed < 20
+    poll_rds(radio, 2)
+    assert radio.rssi_smoothed == pytest.approx(20, abs=1)
+
+
+def test_rssi_interval_adapts():
+    radio, chip = make_radio(9000)
+    assert not radio.rds_ready
+    poll_rds(radio, 10)
+    interval = radio.rssi_interval
+    assert interval > radio.interval_min
+    chip.stations[9000] = 40
+    changed = radio.clock.now
+    while radio.rssi != 40:
+        poll_rds(radio, 0.05)
+    assert radio.clock.now - changed <= interval + 0.1
+    assert radio.rssi_interval == radio.interval_min
+    poll_rds(radio, 5)
+    assert radio.rds_ready
+
+
+def test_rssi_interval_capped():
+    radio, chip = make_radio(9000)
+    poll_rds(radio, 60)
+    assert radio.rssi_interval <= radio.interval_max
+    chip.stations[9000] = radio.rds_threshold + 1
+    changed = radio.clock.now
+    while radio.rssi == chip.noise_floor:
+        poll_rds(radio, 0.05)
+    assert radio.clock.now - changed <= radio.interval_max + 0.1
+
+
+def test_rds_ready_at_threshold():
+    radio, chip = make_radio(9000)
+    chip.stations[9000] = radio.rds_threshold
+    radio.set_freq(9000)
+    assert radio.rds_ready
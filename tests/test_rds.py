@@ -0,0 +1,228 @@
+# SPDX-FileCopyrightText: Copyright (c) 2022 tinkeringtech for TinkeringTech LLC
+#
+# SPDX-License-Identifier: MIT
+
+import tinkeringtech_rda5807m
+from tinkeringtech_rda5807m_emulator import RDA5807MEmulator
+
+FREQUENCY = 9950
+PI_CODE = 0x54A8
+STATION = "TINKER  "
+
+
+def station_groups(name=STATION, bler=0):
+    groups = []
+    for seg in range(4):
+        block4 = (ord(name[2 * seg]) << 8) | ord(name[2 * seg + 1])
+        groups.append((PI_CODE, 0x0800 | seg, PI_CODE, block4, bler))
+    return groups
+
+
+class Received:
+    def __init__(self, rds):
+        self.names = []
+        self.texts = []
+        self.times = []
+        rds.attach_service_name_callback(self.names.append)
+        rds.attach_text_callback(self.texts.append)
+        rds.attach_time_callback(self.on_time)
+
+    def on_time(self, hour, minute):
+        self.times.append((hour, minute))
+
+
+def listen(groups, seconds=10):
+    clock = tinkeringtech_rda5807m.VirtualClock()
+    chip = RDA5807MEmulator(
+        stations={FREQUENCY: 40}, rds={FREQUENCY: groups}, clock=clock
+    )
+    rds = tinkeringtech_rda5807m.RDSParser()
+    received = Received(rds)
+    radio = tinkeringtech_rda5807m.Radio(
+        chip, rds, FREQUENCY, sequential=chip.sequential, clock=clock
+    )
+    end = clock.now + seconds
+    while clock.now < end:
+        clock.sleep(chip.rds_group_time / 2)
+        radio.check_rds()
+    return rds, received
+
+
+def test_station_name():
+    rds, received = listen(station_groups())
+    assert received.names[-1] == STATION
+    assert rds.rds_pi == PI_CODE
+    assert rds.groups_accepted > 0
+    assert not rds.groups_rejected
+
+
+def test_clock_time():
+    # 4A group for 12:34 UTC on MJD 60000, without local offset
+    mjd = 60000
+    block2 = 0x4000 | mjd >> 15
+    block3 = (mjd << 1) & 0xFFFF | 12 >> 4
+    block4 = (12 & 0x0F) << 12 | 34 << 6
+    _, received = listen([(PI_CODE, block2, block3, block4)] * 3)
+    assert received.times[0] == (12, 34)
+
+
+def test_unknown_groups_are_ignored():
+    groups = station_groups() + [(PI_CODE, 0xD000, 0x1234, 0x5678)] * 4
+    rds, received = listen(groups)
+    assert received.names[-1] == STATION
+    assert not rds.groups_rejected
+
+
+def test_process_data_dispatch():
+    rds = tinkeringtech_rda5807m.RDSParser()
+    received = Received(rds)
+    for group in station_groups():
+        for _ in range(rds.ps_confirmations):
+            rds.process_data(*group)
+    assert rds.rds_group_type == 0x01
+    assert received.names == [STATION]
+
+
+def test_group_0a_af():
+    rds = tinkeringtech_rda5807m.RDSParser()
+    # AF codes 1 and 120, 87.6 and 99.5 MHz, then a filler code
+    rds.process_data(PI_CODE, 0x0000, 0x0178, 0x2020)
+    rds.process_data(PI_CODE, 0x0000, 0xCD78, 0x2020)
+    assert rds.alt_freqs == [8760, 9950]
+
+
+def test_group_1a_3a_and_15b():
+    rds = tinkeringtech_rda5807m.RDSParser()
+    rds.process_data(PI_CODE, 0x1000, 0x00E2, 0x1234)
+    assert (rds.pin, rds.ecc) == (0x1234, 0xE2)
+    rds.process_data(PI_CODE, 0x3000 | 0x0018, 0x0000, 0xCD46)
+    assert rds.oda == {0x18: 0xCD46}
+    rds.process_data(PI_CODE, 0xF800 | 0x0018, 0x0000, 0x0000)
+    assert rds.rds_ta and rds.rds_ms
+    assert rds.rds_group_type == 0x1F
+
+
+def test_group_10a_ptyn():
+    rds = tinkeringtech_rda5807m.RDSParser()
+    rds.process_data(PI_CODE, 0xA000, 0x464F, 0x4F54)
+    rds.process_data(PI_CODE, 0xA001, 0x4241, 0x4C4C)
+    assert rds.ptyn == "FOOTBALL"
+
+
+def test_group_14a_other_networks():
+    rds = tinkeringtech_rda5807m.RDSParser()
+    for variant, chars in enumerate((0x4F54, 0x4845, 0x5220, 0x4649)):
+        rds.process_data(PI_CODE, 0xE000 | variant, chars, 0x5201)
+    assert bytes(rds.eon[0x5201]) == b"OTHER FI"
+
+
+def test_bler_b_rejects_groups():
+    rds, received = listen(station_groups(bler=0x02))
+    assert not received.names
+    assert rds.groups_rejected > 0
+    assert not rds.groups_accepted
+
+
+def test_bler_a_ignores_pi_code():
+    rds = tinkeringtech_rda5807m.RDSParser()
+    rds.process_data(PI_CODE, 0x0800, PI_CODE, 0x5449, bler=0x0C)
+    assert rds.groups_accepted == 1
+    assert rds.rds_pi is None
+    rds.process_data(PI_CODE, 0x0800, PI_CODE, 0x5449, bler=0x04)
+    assert rds.rds_pi == PI_CODE
+
+
+def test_decode_groups_bler():
+    groups = [
+        (PI_CODE, 0x0800, PI_CODE, 0x5449, 0x03),
+        (PI_CODE, 0x0800, PI_CODE, 0x5449, 0x0C),
+        (PI_CODE, 0x0800, PI_CODE, 0x5449, 0x00),
+    ]
+    events = list(
+        tinkeringtech_rda5807m.decode_groups(groups, tinkeringtech_rda5807m.EVENT_PI)
+    )
+    assert [event.value for event in events] == [PI_CODE]
+
+
+def text_groups(text, ab_flag=0):
+    # 2A groups up to the segment holding the end of text marker
+    text = text + " " * (-len(text) % 4)
+    groups = []
+    for seg in range(len(text) // 4):
+        chars = text[4 * seg : 4 * seg + 4]
+        block3 = (ord(chars[0]) << 8) | ord(chars[1])
+        block4 = (ord(chars[2]) << 8) | ord(chars[3])
+        groups.append((PI_CODE, 0x2000 | ab_flag | seg, block3, block4))
+    return groups
+
+
+def test_radio_text():
+    text = "Hello from the emulator\r"
+    _, received = listen(station_groups() + text_groups(text))
+    assert received.texts[-1] == text[:-1]
+
+
+def test_text_end_marker():
+    rds = tinkeringtech_rda5807m.RDSParser()
+    received = Received(rds)
+    groups = text_groups("Short text\r")
+    # Segments out of order, the text is complete with the third one
+    for group in (groups[2], groups[0]):
+        rds.process_data(*group)
+    assert not received.texts
+    rds.process_data(*groups[1])
+    assert received.texts == ["Short text"]
+    # Repeats do not publish again
+    for group in groups:
+        rds.process_data(*group)
+    assert len(received.texts) == 1
+
+
+def test_text_ab_flag_clears_text():
+    rds = tinkeringtech_rda5807m.RDSParser()
+    received = Received(rds)
+    for group in text_groups("Old text\r"):
+        rds.process_data(*group)
+    new = text_groups("New\r", ab_flag=0x0010)
+    rds.process_data(*new[0])
+    assert received.texts[-1] == "New"
+
+
+def test_text_2b_groups():
+    rds = tinkeringtech_rda5807m.RDSParser()
+    received = Received(rds)
+    for seg, chars in enumerate((0x4869, 0x2074, 0x6865, 0x7265, 0x0D20)):
+        rds.process_data(PI_CODE, 0x2800 | seg, PI_CODE, chars)
+    assert received.texts[-1] == "Hi there"
+
+
+def test_station_name_confirmed():
+    rds = tinkeringtech_rda5807m.RDSParser()
+    received = Received(rds)
+    groups = station_groups()
+    for group in groups:
+        rds.process_data(*group)
+    assert not received.names
+    for group in groups:
+        rds.process_data(*group)
+    assert received.names == [STATION]
+
+
+def test_cleaner_copy_is_delivered():
+    group = station_groups()[0]
+    rds, _ = listen([group[:4] + (0x02,), group])
+    assert rds.groups_rejected == 1
+    assert rds.groups_accepted == 1
+
+
+def test_new_text_same_ab_flag():
+    rds = tinkeringtech_rda5807m.RDSParser()
+    received = Received(rds)
+    for group in text_groups("A long radio text message here, quite long\r"):
+        rds.process_data(*group)
+    short = text_groups("Short\r")
+    rds.process_data(*short[0])
+    assert len(received.texts) == 1
+    rds.process_data(*short[1])
+    assert received.texts == ["A long radio text message here, quite long", "Short"]
+    assert rds.rds_text == "Short"
@@ -0,0 +1,72 @@
+# SPDX-FileCopyrightText: Copyright (c) 2022 tinkeringtech for TinkeringTech LLC
+#
+# SPDX-License-Identifier: MIT
+
+import time
+import tinkeringtech_rda5807m
+from tinkeringtech_rda5807m_emulator import RDA5807MEmulator
+from tinkeringtech_rda5807m_tools import BusMonitor, Profiler, RDSHarvester
+
+FREQUENCY = 9950
+PI_CODE = 0x54A8
+
+
+def make_radio():
+    groups = [(PI_CODE, 0x0800 | seg, PI_CODE, 0x4142) for seg in range(4)]
+    clock = tinkeringtech_rda5807m.VirtualClock()
+    chip = RDA5807MEmulator(
+        stations={FREQUENCY: 40, 10110: 20}, rds={FREQUENCY: groups}, clock=clock
+    )
+    rds = tinkeringtech_rda5807m.RDSParser()
+    radio = tinkeringtech_rda5807m.Radio(
+        chip, rds, FREQUENCY, sequential=chip.sequential, clock=clock
+    )
+    return radio, chip
+
+
+def test_harvester():
+    radio, chip = make_radio()
+    harvester = RDSHarvester()
+    assert harvester.add(radio) == 0
+    harvester.start(interval=0)
+    deadline = time.monotonic() + 5
+    while harvester.stats[0].groups < 8 and time.monotonic() < deadline:
+        radio.clock.sleep(chip.rds_group_time)
+        time.sleep(0.001)
+    harvester.stop()
+    assert harvester.stats[0].groups >= 8
+    assert harvester.stats[0].polls >= harvester.stats[0].groups
+    event = harvester.events.get_nowait()
+    assert event == (0, "name", "ABABABAB")
+
+
+def test_bus_monitor():
+    radio, chip = make_radio()
+    board = radio.board
+    monitor = BusMonitor(radio)
+    monitor.install()
+    transactions = chip.transactions
+    radio.set_volume(5)
+    radio.seek_up()
+    monitor.uninstall()
+    assert radio.board is board
+    assert "set_volume" not in radio.__dict__
+    counted = sum(stats.transactions for stats in monitor.stats.values())
+    assert counted == chip.transactions - transactions
+    assert monitor.stats["set_volume"].transactions == 1
+    assert monitor.stats["seek_up"].calls == 1
+
+
+def test_profiler():
+    radio, chip = make_radio()
+    names = []
+    profiler = Profiler(radio, post=lambda name, _elapsed: names.append(name))
+    profiler.install()
+    for _ in range(10):
+        radio.clock.sleep(chip.rds_group_time)
+        radio.check_rds()
+    profiler.uninstall()
+    assert profiler.stats["check_rds"].calls == 10
+    assert profiler.stats["process_data 0B"].calls > 0
+    assert "check_rds" in names
+    assert "check_rds" not in radio.__dict__
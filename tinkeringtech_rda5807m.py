@@ -2,6 +2,7 @@
 # SPDX-FileCopyrightText: Copyright (c) 2022 tinkeringtech for TinkeringTech LLC
 #
 # SPDX-License-Identifier: MIT
+# pylint: disable=too-many-lines
 """
 `tinkeringtech_rda5807m`
 ================================================================================
@@ -31,8 +32,15 @@ Implementation Notes
 
 __version__ = "0.0.0-auto.0"
 __repo__ = "https://github.com/tinkeringtech/Tinkeringtech_CircuitPython_rda5807m.git"
+import array
+import struct
 import time
 
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
 # Registers definitions
 FREQ_STEPS = 10
 RADIO_REG_CHIPID = 0x00
@@ -44,6 +52,7 @@ RADIO_REG_CTRL_MONO = 0x2000
 RADIO_REG_CTRL_BASS = 0x1000
 RADIO_REG_CTRL_SEEKUP = 0x0200
 RADIO_REG_CTRL_SEEK = 0x0100
+RADIO_REG_CTRL_SKMODE = 0x0080
 RADIO_REG_CTRL_RDS = 0x0008
 RADIO_REG_CTRL_NEW = 0x0004
 RADIO_REG_CTRL_RESET = 0x0002
@@ -52,11 +61,14 @@ RADIO_REG_CTRL_ENABLE = 0x0001
 RADIO_REG_CHAN = 0x03
 RADIO_REG_CHAN_SPACE = 0x0003
 RADIO_REG_CHAN_SPACE_100 = 0x0000
+RADIO_REG_CHAN_SPACE_200 = 0x0001
+RADIO_REG_CHAN_SPACE_50 = 0x0002
+RADIO_REG_CHAN_SPACE_25 = 0x0003
 RADIO_REG_CHAN_BAND = 0x000C
 RADIO_REG_CHAN_BAND_FM = 0x0000
 RADIO_REG_CHAN_BAND_FMWORLD = 0x0008
 RADIO_REG_CHAN_TUNE = 0x0010
-RADIO_REG_CHAN_NR = 0x7FC0
+RADIO_REG_CHAN_NR = 0xFFC0
 
 RADIO_REG_R4 = 0x04
 RADIO_REG_R4_EM50 = 0x0800
@@ -73,16 +85,66 @@ RADIO_REG_RA_STEREO = 0x0400
 RADIO_REG_RA_NR = 0x03FF
 RADIO_REG_RA_STC = 0x4000
 RADIO_REG_RA_SF = 0x2000
+RADIO_REG_RA_RDSS = 0x1000
 
 RADIO_REG_RB = 0x0B
 RADIO_REG_RB_FMTRUE = 0x0100
 RADIO_REG_RB_FMREADY = 0x0080
+RADIO_REG_RB_ABCD_E = 0x0010
+RADIO_REG_RB_BLERA = 0x000C
+RADIO_REG_RB_BLERB = 0x0003
 
 RADIO_REG_RDSA = 0x0C
 RADIO_REG_RDSB = 0x0D
 RADIO_REG_RDSC = 0x0E
 RADIO_REG_RDSD = 0x0F
 
+# RDS capture records: milliseconds since the capture started, frequency in
+# 10 kHz units, RSSI, block error levels and blocks A to D, little endian
+CAPTURE_RECORD_FORMAT = "<IHBBHHHH"
+CAPTURE_RECORD_SIZE = 16
+
+
+class Clock:
+    """
+    The time source used by :class:`Radio`, backed by the time module
+
+    Pass a :class:`VirtualClock` instead to run against the emulator faster than
+    real time.
+    """
+
+    @staticmethod
+    def monotonic():
+        """Returns the current time in seconds."""
+        return time.monotonic()
+
+    @staticmethod
+    def sleep(seconds):
+        """Waits for the given number of seconds."""
+        time.sleep(seconds)
+
+
+class VirtualClock:
+    """
+    A simulated clock that only moves forward when slept on or advanced
+
+    ``step`` is added on every :meth:`monotonic` call, which models the time a
+    polling loop spends per iteration so that busy loops still make progress.
+    """
+
+    def __init__(self, start=0.0, step=0.0):
+        self.now = start
+        self.step = step
+
+    def monotonic(self):
+        """Returns the simulated time in seconds."""
+        self.now += self.step
+        return self.now
+
+    def sleep(self, seconds):
+        """Advances the simulated time without waiting."""
+        self.now += seconds
+
 
 # Radio class definition
 class Radio:
@@ -93,9 +155,6 @@ class Radio:
     A class for communicating with the rda5807m chip
     """
 
-    # Initialize virtual registers
-    registers = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
-
     # Chip constants
     address = 0x11
     maxvolume = 15
@@ -107,8 +166,35 @@ class Radio:
     rssi = 0
 
     # Set default frequency and volume
-    def __init__(self, board, rds_parser, frequency=10000, volume=1):
+    def __init__(
+        self,
+        board,
+        rds_parser,
+        frequency=10000,
+        volume=1,
+        sequential=None,
+        clock=None,
+        attach=False,
+    ):
+        # pylint: disable=too-many-arguments
         self.board = board
+        # Initialize virtual registers
+        self.registers = array.array("H", (0,) * 16)
+        # Time source for all waits and intervals
+        self.clock = clock if clock is not None else Clock()
+        # Optional device on the chip's sequential access address (0x10)
+        self.sequential = sequential
+        # Register address followed by registers 2..7, used for bulk writes
+        self._write_buffer = bytearray(13)
+        # Register values last written to the chip, and a bit mask of registers
+        # whose shadow value still has to be written
+        self._chip_registers = array.array("l", (-1,) * 8)
+        self._dirty = 0
+        self._batch_depth = 0
+        self._batch = _Batch(self)
+        # Registers RA to RDSD, filled by bulk status reads
+        self._read_buffer = bytearray(12)
+        self._read_address = bytes([RADIO_REG_RA])
         self.frequency = frequency
 
         # Basic audio info
@@ -127,18 +213,147 @@ class Radio:
         # Is the signal strong enough to get rds?
         self.rds_ready = False
         self.rds_threshold = 10  # rssi threshold for accepting rds - change as needed
-        self.interval = 10  # Used for timing rssi checks - in seconds
-        self.initial = time.monotonic()  # Time since boot
+        self.rds_bler = 0  # Block error levels of the last rds group
+        self._capture = None  # Stream the received rds groups are recorded to
+        self._capture_start = 0
+        self._record = bytearray(CAPTURE_RECORD_SIZE)
+        self.rds_hysteresis = 2  # rds stops below rds_threshold minus this
+        self.rssi_smoothing = 2  # A new rssi sample weighs 1 / 2 ** rssi_smoothing
+        self.interval_max = 1  # Longest time between rssi checks - in seconds
+        self.interval_min = 0.5  # Shortest time between rssi checks - in seconds
+        self.rssi_interval = self.interval_min  # Current time between rssi checks
+        self.initial = self.clock.monotonic()  # Time of the last rssi check
+        self._rssi_x8 = 0  # Smoothed rssi, times 8
+
+        # Tune completion polling
+        self.poll_interval = 0.005  # Delay between STC polls - in seconds
+        self.tune_timeout = 0.5  # Give up waiting for STC after this long - in seconds
+        self.tune_latency = None  # Measured duration of the last tune - in seconds
+        self.seek_timeout = 5  # Abandon a seek after this long - in seconds
+        self._sweep_restore = None  # Spacing and frequency to return to after a sweep
+        self._tune_start = 0  # When the last tune was started
+
+        # Channel spacing in kHz: 25, 50, 100 or 200
+        self.spacing = 100
 
         # Band - Default FMWORLD
         # 1. FM
         # 2. FMWORLD
         self.band = "FM"
 
+        # With attach, a chip that is already running is adopted as it is
+        if attach and self.attach():
+            return
         # Functions saves register values to virtual registers, sets the basic frequency and volume
         self.setup()
         self.tune()  # Apply volume and frequency
 
+    def attach(self):
+        """Adopts the state of a chip that is already running, without a reset.
+
+        Registers RADIO_REG_CTRL to RADIO_REG_RDSD are read in one transaction,
+        and frequency, volume, band, spacing and the audio switches are taken
+        from them. Returns False, with nothing written to the chip, if it is not
+        enabled and still needs :meth:`setup`.
+        """
+        buf = bytearray(2 * (RADIO_REG_RDSD - RADIO_REG_CTRL + 1))
+        with self.board:
+            self.board.write_then_readinto(bytes([RADIO_REG_CTRL]), buf)
+        registers = self.registers
+        for i in range(RADIO_REG_CTRL, RADIO_REG_RDSD + 1):
+            offset = 2 * (i - RADIO_REG_CTRL)
+            registers[i] = (buf[offset] << 8) | buf[offset + 1]
+        reg_ctrl = registers[RADIO_REG_CTRL]
+        if not reg_ctrl & RADIO_REG_CTRL_ENABLE:
+            return False
+
+        # Keep later writes from resetting, seeking or retuning
+        registers[RADIO_REG_CTRL] = reg_ctrl & ~(
+            RADIO_REG_CTRL_RESET | RADIO_REG_CTRL_SEEK
+        )
+        registers[RADIO_REG_CHAN] = registers[RADIO_REG_CHAN] & ~RADIO_REG_CHAN_TUNE
+        for i in range(RADIO_REG_CTRL, len(self._chip_registers)):
+            self._chip_registers[i] = registers[i]
+        self._dirty = 0
+        self._adopt_registers()
+        self._end_tune()
+        self.tuned = True
+        return True
+
+    def snapshot(self):
+        """Returns the tuner configuration as a compact bytes blob.
+
+        The blob holds registers RADIO_REG_CTRL to RADIO_REG_VOL (with band,
+        spacing, volume and the audio switches), the frequency and
+        ``rds_threshold``. Registers 6 and 7 are left out, the driver never sets
+        them and the chip keeps its power-on values there. Store the blob, in
+        NVM for instance, and give it to :meth:`restore`.
+        """
+        registers = self.registers
+        return struct.pack(
+            _SNAPSHOT_FORMAT,
+            _SNAPSHOT_VERSION,
+            registers[RADIO_REG_CTRL],
+            registers[RADIO_REG_CHAN],
+            registers[RADIO_REG_R4],
+            registers[RADIO_REG_VOL],
+            self.frequency,
+            self.rds_threshold,
+        )
+
+    def restore(self, blob):
+        """Reapplies a configuration saved by :meth:`snapshot` in one bus write.
+
+        Like :meth:`start_tune` it does not wait for the tune to complete, call
+        :meth:`poll_tune` or :meth:`wait_tune` for that.
+        """
+        if len(blob) != _SNAPSHOT_SIZE or blob[0] != _SNAPSHOT_VERSION:
+            raise ValueError("Not a radio snapshot")
+        values = struct.unpack(_SNAPSHOT_FORMAT, blob)
+        reg_chan = values[RADIO_REG_CHAN - 1]
+        _check_channels(
+            _BAND_LIMITS[(reg_chan & RADIO_REG_CHAN_BAND) >> 2],
+            _CHANNEL_SPACINGS[reg_chan & RADIO_REG_CHAN_SPACE],
+        )
+        registers = self.registers
+        for i in range(RADIO_REG_CTRL, RADIO_REG_VOL + 1):
+            registers[i] = values[i - 1]
+        registers[RADIO_REG_CTRL] = registers[RADIO_REG_CTRL] & ~(
+            RADIO_REG_CTRL_RESET | RADIO_REG_CTRL_SEEK
+        )
+        self.rds_threshold = values[6]
+        self._adopt_registers()
+
+        # Tune to the saved frequency in the same write
+        freq = min(max(values[5], self.freq_low), self.freq_high)
+        self.frequency = freq
+        channel = (freq - self.freq_low) * 10 // self.spacing
+        reg_channel = (registers[RADIO_REG_CHAN] & ~RADIO_REG_CHAN_NR) | (channel << 6)
+        registers[RADIO_REG_CHAN] = reg_channel | RADIO_REG_CHAN_TUNE
+        self.save_register_range(RADIO_REG_CTRL, RADIO_REG_VOL)
+        registers[RADIO_REG_CHAN] = reg_channel & ~RADIO_REG_CHAN_TUNE
+        self._chip_registers[RADIO_REG_CHAN] = registers[RADIO_REG_CHAN]
+        self._tune_start = self.clock.monotonic()
+        self.tuned = True
+
+    def _adopt_registers(self):
+        # Sets band, spacing, volume and the audio switches from the shadow
+        # registers
+        registers = self.registers
+        reg_ctrl = registers[RADIO_REG_CTRL]
+        reg_chan = registers[RADIO_REG_CHAN]
+        band = reg_chan & RADIO_REG_CHAN_BAND
+        self.band = "FM" if band == RADIO_REG_CHAN_BAND_FM else "FMWORLD"
+        self.freq_low = _BAND_LIMITS[band >> 2][0] // 10
+        self.freq_high = _BAND_LIMITS[band >> 2][1] // 10
+        self.spacing = _CHANNEL_SPACINGS[reg_chan & RADIO_REG_CHAN_SPACE]
+        self.volume = registers[RADIO_REG_VOL] & RADIO_REG_VOL_VOL
+        self.mono = bool(reg_ctrl & RADIO_REG_CTRL_MONO)
+        self.bass_boost = bool(reg_ctrl & RADIO_REG_CTRL_BASS)
+        self.mute = not reg_ctrl & RADIO_REG_CTRL_UNMUTE
+        self.soft_mute = bool(registers[RADIO_REG_R4] & RADIO_REG_R4_SOFTMUTE)
+        self.rds = bool(reg_ctrl & RADIO_REG_CTRL_RDS)
+
     def setup(self):
         """docstring."""
         # Initialize registers
@@ -150,9 +365,11 @@ class Radio:
         # Initialized to volume - 6 by default
         self.registers[RADIO_REG_VOL] = 0x84D1
         # Other registers are already set to zero
-        # Update registers
+        # Update registers, CHAN and R4 keep their power-on values
         self.save_register(RADIO_REG_CTRL)
         self.save_register(RADIO_REG_VOL)
+        # Adopt the power-on R4, so that writes spanning it do not clear it
+        self.read_register(RADIO_REG_R4)
 
         self.registers[RADIO_REG_CTRL] = (
             RADIO_REG_CTRL_ENABLE
@@ -161,11 +378,14 @@ class Radio:
             | RADIO_REG_CTRL_UNMUTE
             | RADIO_REG_CTRL_OUTPUT
         )
-        self.save_register(RADIO_REG_CTRL)
 
         # Turn on bass boost and rds
-        self.set_bass_boost(True)
+        self.registers[RADIO_REG_CTRL] = (
+            self.registers[RADIO_REG_CTRL] | RADIO_REG_CTRL_BASS
+        )
+        self.save_register(RADIO_REG_CTRL)
 
+        self.bass_boost = True
         self.rds = True
         self.mute = False
 
@@ -177,17 +397,34 @@ class Radio:
         self.tuned = True
 
     def set_freq(self, freq):
-        """docstring."""
+        """Tunes to freq and waits for the chip to report completion.
+
+        Returns the measured tune latency in seconds, or None if the chip did not
+        set the STC bit within ``tune_timeout``.
+        """
+        self.start_tune(freq)
+        # Wait for the tune to complete, RA now holds the tuned channel
+        latency = self.wait_tune()
+        self._end_tune()
+        return latency
+
+    def start_tune(self, freq):
+        """Starts tuning to freq without waiting, see :meth:`poll_tune`."""
         # Sets frequency to freq
         if freq < self.freq_low:
             freq = self.freq_low
         elif freq > self.freq_high:
             freq = self.freq_high
         self.frequency = freq
-        new_channel = (freq - self.freq_low) // 10
+        new_channel = (freq - self.freq_low) * 10 // self.spacing
 
         reg_channel = RADIO_REG_CHAN_TUNE  # Enable tuning
         reg_channel = reg_channel | (new_channel << 6)
+        # Keep band and spacing
+        reg_channel = reg_channel | (
+            self.registers[RADIO_REG_CHAN]
+            & (RADIO_REG_CHAN_BAND | RADIO_REG_CHAN_SPACE)
+        )
 
         # Enable output, unmute
         self.registers[RADIO_REG_CTRL] = self.registers[RADIO_REG_CTRL] | (
@@ -196,25 +433,92 @@ class Radio:
             | RADIO_REG_CTRL_RDS
             | RADIO_REG_CTRL_ENABLE
         )
-        self.save_register(RADIO_REG_CTRL)
-
-        # Save frequency to register
-        self.registers[RADIO_REG_CHAN] = reg_channel
-        self.save_register(RADIO_REG_CHAN)
-        time.sleep(0.2)
-
-        # Adjust volume
-        self.save_register(RADIO_REG_VOL)
-        time.sleep(0.3)
-
-        # Get frequnecy
-        self.get_freq()
+        self.update_register(RADIO_REG_CTRL)
+
+        # Save frequency to register, together with any pending changes
+        self._tune_channel(reg_channel)
+        self._tune_start = self.clock.monotonic()
+
+    def poll_tune(self):
+        """Checks once whether the tune started by :meth:`start_tune` is over.
+
+        Returns True once the chip reports completion or ``tune_timeout`` expired,
+        ``tune_latency`` then holds the measured latency or None.
+        """
+        self._read_ra_rb()
+        elapsed = self.clock.monotonic() - self._tune_start
+        if self.registers[RADIO_REG_RA] & RADIO_REG_RA_STC:
+            self.tune_latency = elapsed
+        elif elapsed >= self.tune_timeout:
+            self.tune_latency = None
+        else:
+            return False
+        self._end_tune()
+        return True
 
-        if self.get_rssi() > self.rds_threshold:
-            self.rds_ready = True
+    def _end_tune(self):
+        # Updates frequency, rssi and rds readiness from the RA and RB just read
+        chnl = self.registers[RADIO_REG_RA] & RADIO_REG_RA_NR
+        self.frequency = self.freq_low + chnl * self.spacing // 10
+        self._reset_rssi(self.registers[RADIO_REG_RB] >> 10)
+
+    def _reset_rssi(self, rssi):
+        # Restarts rssi tracking on a new channel
+        self.rssi = rssi
+        self._rssi_x8 = rssi << 3
+        self.rds_ready = rssi >= self.rds_threshold
+        self.rssi_interval = self.interval_min
+        self.initial = self.clock.monotonic()
+
+    def _track_rssi(self, rssi):
+        # Smooths the rssi, switches rds_ready with hysteresis and adapts the
+        # time between rssi checks to how stable the signal is
+        self.rssi = rssi
+        average = self._rssi_x8
+        if abs((rssi << 3) - average) > self.rds_hysteresis << 3:
+            self.rssi_interval = self.interval_min
         else:
+            self.rssi_interval = min(self.rssi_interval * 2, self.interval_max)
+        average += ((rssi << 3) - average) >> self.rssi_smoothing
+        self._rssi_x8 = average
+        if average >= self.rds_threshold << 3:
+            self.rds_ready = True
+        elif average < (self.rds_threshold - self.rds_hysteresis) << 3:
             self.rds_ready = False
 
+    @property
+    def rssi_smoothed(self):
+        """The rssi averaged over the last samples."""
+        return self._rssi_x8 / 8
+
+    def _tune_channel(self, reg_channel):
+        # Writes the CHAN register with the tune bit set, flushing pending changes
+        self.registers[RADIO_REG_CHAN] = reg_channel | RADIO_REG_CHAN_TUNE
+        self.write_register(RADIO_REG_CHAN)
+        # The chip clears the tune bit itself, keep later writes from retuning
+        self.registers[RADIO_REG_CHAN] = reg_channel & (~RADIO_REG_CHAN_TUNE)
+        self._chip_registers[RADIO_REG_CHAN] = self.registers[RADIO_REG_CHAN]
+
+    def wait_tune(self, timeout=None):
+        """Polls register RA until the seek/tune complete (STC) bit is set.
+
+        Returns the elapsed time in seconds, or None if ``timeout`` (defaults to
+        ``tune_timeout``) expired first. The result is also kept in ``tune_latency``.
+        """
+        if timeout is None:
+            timeout = self.tune_timeout
+        start = self.clock.monotonic()
+        while True:
+            self._read_ra_rb()
+            elapsed = self.clock.monotonic() - start
+            if self.registers[RADIO_REG_RA] & RADIO_REG_RA_STC:
+                self.tune_latency = elapsed
+                return elapsed
+            if elapsed >= timeout:
+                self.tune_latency = None
+                return None
+            self.clock.sleep(self.poll_interval)
+
     def get_freq(self):
         """docstring."""
         # Read register RA
@@ -223,7 +527,7 @@ class Radio:
 
         chnl = self.registers[RADIO_REG_RA] & RADIO_REG_RA_NR
 
-        self.frequency = self.freq_low + chnl * 10
+        self.frequency = self.freq_low + chnl * self.spacing // 10
         return self.frequency
 
     def format_freq(self):
@@ -242,18 +546,42 @@ class Radio:
     def set_band(self, band):
         """docstring."""
         # Changes bands to FM or FMWORLD
-        self.band = band
         if band == "FM":
             r = RADIO_REG_CHAN_BAND_FM
         else:
             r = RADIO_REG_CHAN_BAND_FMWORLD
-        self.registers[RADIO_REG_CHAN] = r | RADIO_REG_CHAN_SPACE_100
-        self.save_register(RADIO_REG_CHAN)
+        _check_channels(_BAND_LIMITS[r >> 2], self.spacing)
+        self.band = band
+        self.freq_low = _BAND_LIMITS[r >> 2][0] // 10
+        self.freq_high = _BAND_LIMITS[r >> 2][1] // 10
+        self.registers[RADIO_REG_CHAN] = (
+            self.registers[RADIO_REG_CHAN] & (~RADIO_REG_CHAN_BAND)
+        ) | r
+        self.update_register(RADIO_REG_CHAN)
+
+    def set_spacing(self, spacing):
+        """Sets the channel spacing in kHz, one of 25, 50, 100 or 200.
+
+        Frequencies stay in 10 kHz units, so with 25 kHz spacing set_freq and
+        get_freq round down to the nearest 10 kHz. The chip numbers at most 1024
+        channels, so 25 kHz spacing is refused on the FMWORLD band.
+        """
+        if spacing not in _CHANNEL_SPACINGS:
+            raise ValueError("Channel spacing must be 25, 50, 100 or 200 kHz")
+        _check_channels((self.freq_low * 10, self.freq_high * 10), spacing)
+        self.spacing = spacing
+        self.registers[RADIO_REG_CHAN] = (
+            self.registers[RADIO_REG_CHAN] & (~RADIO_REG_CHAN_SPACE)
+        ) | _CHANNEL_SPACINGS.index(spacing)
+        self.update_register(RADIO_REG_CHAN)
 
     def term(self):
         """docstring."""
         # Terminates all receiver functions
-        self.set_volume(0)
+        self.volume = 0
+        self.registers[RADIO_REG_VOL] = self.registers[RADIO_REG_VOL] & (
+            ~RADIO_REG_VOL_VOL
+        )
         self.registers[RADIO_REG_CTRL] = 0x0000
         self.save_registers()
 
@@ -267,7 +595,7 @@ class Radio:
         else:
             reg_ctrl = reg_ctrl & (~RADIO_REG_CTRL_BASS)
         self.registers[RADIO_REG_CTRL] = reg_ctrl
-        self.save_register(RADIO_REG_CTRL)
+        self.update_register(RADIO_REG_CTRL)
 
     def set_mono(self, switch_on):
         """docstring."""
@@ -284,7 +612,7 @@ class Radio:
             self.registers[RADIO_REG_CTRL] = self.registers[RADIO_REG_CTRL] & (
                 ~RADIO_REG_CTRL_MONO
             )
-        self.save_register(RADIO_REG_CTRL)
+        self.update_register(RADIO_REG_CTRL)
 
     def set_mute(self, switch_on):
         """docstring."""
@@ -298,7 +626,7 @@ class Radio:
             self.registers[RADIO_REG_CTRL] = (
                 self.registers[RADIO_REG_CTRL] | RADIO_REG_CTRL_UNMUTE
             )
-        self.save_register(RADIO_REG_CTRL)
+        self.update_register(RADIO_REG_CTRL)
 
     def set_soft_mute(self, switch_on):
         """docstring."""
@@ -312,58 +640,190 @@ class Radio:
             self.registers[RADIO_REG_R4] = self.registers[RADIO_REG_R4] & (
                 ~RADIO_REG_R4_SOFTMUTE
             )
-        self.save_register(RADIO_REG_R4)
+        self.update_register(RADIO_REG_R4)
 
     def soft_reset(self):
         """docstring."""
         # Soft reset chip
-        self.registers[RADIO_REG_CTRL] = (
-            self.registers[RADIO_REG_CTRL] | RADIO_REG_CTRL_RESET
-        )
-        self.save_register(RADIO_REG_CTRL)
-        time.sleep(2)
-        self.registers[RADIO_REG_CTRL] = self.registers[RADIO_REG_CTRL] & (
-            ~RADIO_REG_CTRL_RESET
-        )
-        self.save_register(RADIO_REG_CTRL)
+        self.set_reset(True)
+        self.clock.sleep(2)
+        self.set_reset(False)
+
+    def set_reset(self, switch_on):
+        """Sets or clears the soft reset bit."""
+        if switch_on:
+            self.registers[RADIO_REG_CTRL] = (
+                self.registers[RADIO_REG_CTRL] | RADIO_REG_CTRL_RESET
+            )
+        else:
+            self.registers[RADIO_REG_CTRL] = self.registers[RADIO_REG_CTRL] & (
+                ~RADIO_REG_CTRL_RESET
+            )
+        self.write_register(RADIO_REG_CTRL)
 
     def seek_up(self):
-        """docstring."""
-        # Start seek mode upwards
-        self.registers[RADIO_REG_CTRL] = (
-            self.registers[RADIO_REG_CTRL] | RADIO_REG_CTRL_SEEKUP
-        )
+        """Seeks upwards to the next station and returns its frequency."""
+        return self.seek(True)
+
+    def seek_down(self):
+        """Seeks downwards to the next station and returns its frequency."""
+        return self.seek(False)
+
+    def seek(self, upward=True):
+        """Runs a seek to completion, returns the landed frequency."""
+        seek = self.start_seek(upward)
+        while not seek.poll():
+            self.clock.sleep(self.poll_interval)
+        return seek.frequency
+
+    def start_seek(self, upward=True):
+        """Starts a seek and returns a :class:`Seek` to poll for its completion.
+
+        The radio must not be retuned until the returned seek is done or cancelled.
+        """
+        if upward:
+            self.registers[RADIO_REG_CTRL] = (
+                self.registers[RADIO_REG_CTRL] | RADIO_REG_CTRL_SEEKUP
+            )
+        else:
+            self.registers[RADIO_REG_CTRL] = self.registers[RADIO_REG_CTRL] & (
+                ~RADIO_REG_CTRL_SEEKUP
+            )
         self.registers[RADIO_REG_CTRL] = (
             self.registers[RADIO_REG_CTRL] | RADIO_REG_CTRL_SEEK
         )
-        self.save_register(RADIO_REG_CTRL)
+        self.write_register(RADIO_REG_CTRL)
+        return Seek(self, self.seek_timeout)
 
-        # Wait until scan is over
-        time.sleep(1)
-        self.get_freq()
+    def end_seek(self):
+        """Clears the seek bit and updates frequency and rssi from the chip."""
         self.registers[RADIO_REG_CTRL] = self.registers[RADIO_REG_CTRL] & (
             ~RADIO_REG_CTRL_SEEK
         )
-        self.save_register(RADIO_REG_CTRL)
-
-    def seek_down(self):
-        """docstring."""
-        # Start seek mode downwards
-        self.registers[RADIO_REG_CTRL] = self.registers[RADIO_REG_CTRL] & (
-            ~RADIO_REG_CTRL_SEEKUP
-        )
+        self.write_register(RADIO_REG_CTRL)
+        self.get_freq()
+        self._reset_rssi(self.get_rssi())
+
+    def scan_band(self):
+        """Sweeps the band from freq_low to freq_high and returns the stations found.
+
+        Each station is a (frequency, rssi, stereo, fm_true) tuple, the list is
+        sorted by rssi, strongest first. The radio is retuned to the frequency it
+        was on before the scan.
+        """
+        start_freq = self.frequency
+        stations = []
+        for _ in self.scan_steps(self.freq_low, self.freq_high, stations):
+            self.clock.sleep(self.poll_interval)
+        self.set_freq(start_freq)
+        stations.sort(key=lambda station: station[1], reverse=True)
+        return stations
+
+    def scan_steps(self, low, high, stations):
+        """Generator that scans low..high, appending stations found to stations.
+
+        It yields whenever the chip is busy tuning or seeking, so several radios
+        can be scanned at once by stepping their generators in turn.
+        """
+        skmode = self.registers[RADIO_REG_CTRL] & RADIO_REG_CTRL_SKMODE
+        # Stop seeking at the upper band limit instead of wrapping around
         self.registers[RADIO_REG_CTRL] = (
-            self.registers[RADIO_REG_CTRL] | RADIO_REG_CTRL_SEEK
+            self.registers[RADIO_REG_CTRL] | RADIO_REG_CTRL_SKMODE
         )
-        self.save_register(RADIO_REG_CTRL)
+        self.start_tune(low)
+        while not self.poll_tune():
+            yield
+        self._scan_record(stations, False)
+        last = self.frequency
+        while True:
+            seek = self.start_seek(True)
+            while not seek.poll():
+                yield
+            if seek.failed or not last < seek.frequency <= high:
+                break
+            last = seek.frequency
+            self._scan_record(stations, True)
 
-        # Wait until scan is over
-        time.sleep(1)
-        self.get_freq()
-        self.registers[RADIO_REG_CTRL] = self.registers[RADIO_REG_CTRL] & (
-            ~RADIO_REG_CTRL_SEEK
+        self.registers[RADIO_REG_CTRL] = (
+            self.registers[RADIO_REG_CTRL] & (~RADIO_REG_CTRL_SKMODE)
+        ) | skmode
+        self.update_register(RADIO_REG_CTRL)
+
+    def _scan_record(self, stations, seek_hit):
+        # Adds the current channel to stations if a seek stopped here or the chip
+        # reports a station
+        self.read_registers()
+        fm_true = bool(self.registers[RADIO_REG_RB] & RADIO_REG_RB_FMTRUE)
+        if seek_hit or fm_true:
+            chnl = self.registers[RADIO_REG_RA] & RADIO_REG_RA_NR
+            stations.append(
+                (
+                    self.freq_low + chnl * self.spacing // 10,
+                    self.registers[RADIO_REG_RB] >> 10,
+                    bool(self.registers[RADIO_REG_RA] & RADIO_REG_RA_STEREO),
+                    fm_true,
+                )
+            )
+
+    def sweep_spectrum(self, spacing=None, settle=0):
+        """Steps through every channel of the band and yields (frequency, rssi).
+
+        Unlike everywhere else, frequency is in kHz here so that 25 kHz steps stay
+        exact. Each channel is held only until the chip reports the tune complete,
+        plus ``settle`` seconds. ``spacing`` defaults to the current spacing. The
+        radio returns to its previous spacing and frequency once the sweep ends.
+        """
+        channels = self._sweep_start(spacing)
+        try:
+            for channel in range(channels):
+                rssi = self._sweep_channel(channel, settle)
+                yield (self.freq_low * 10 + channel * self.spacing, rssi)
+        finally:
+            self._sweep_end()
+
+    def sweep_spectrum_into(self, buffer, spacing=None, settle=0):
+        """Like :meth:`sweep_spectrum`, storing the RSSI of each channel in buffer.
+
+        buffer, a preallocated bytearray or array, receives one value per channel
+        starting at freq_low. Returns the number of channels swept, which is
+        limited by the length of buffer.
+        """
+        channels = min(self._sweep_start(spacing), len(buffer))
+        try:
+            for channel in range(channels):
+                buffer[channel] = self._sweep_channel(channel, settle)
+        finally:
+            self._sweep_end()
+        return channels
+
+    def _sweep_start(self, spacing):
+        # Switches to the sweep spacing and returns the number of channels
+        self._sweep_restore = (self.spacing, self.frequency)
+        if spacing is not None and spacing != self.spacing:
+            self.set_spacing(spacing)
+        return (self.freq_high - self.freq_low) * 10 // self.spacing + 1
+
+    def _sweep_channel(self, channel, settle):
+        # Tunes to channel and returns its rssi
+        self._tune_channel(
+            (
+                self.registers[RADIO_REG_CHAN]
+                & (RADIO_REG_CHAN_BAND | RADIO_REG_CHAN_SPACE)
+            )
+            | (channel << 6)
         )
-        self.save_register(RADIO_REG_CTRL)
+        self.wait_tune()
+        if settle:
+            self.clock.sleep(settle)
+            self._read_ra_rb()
+        self.rssi = self.registers[RADIO_REG_RB] >> 10
+        return self.rssi
+
+    def _sweep_end(self):
+        spacing, frequency = self._sweep_restore
+        if spacing != self.spacing:
+            self.set_spacing(spacing)
+        self.set_freq(frequency)
 
     def set_volume(self, volume):
         """docstring."""
@@ -375,58 +835,111 @@ class Radio:
             ~RADIO_REG_VOL_VOL
         )
         self.registers[RADIO_REG_VOL] = self.registers[RADIO_REG_VOL] | volume
-        self.save_register(RADIO_REG_VOL)
+        self.update_register(RADIO_REG_VOL)
 
     def check_rds(self):
-        """docstring."""
-        # Check for rds data
-        self.check_threshold()
-        if self.send_rds and self.rds_ready:
-            self.registers[RADIO_REG_RA] = self.read16()
-
-            if self.registers[RADIO_REG_RA] & RADIO_REG_RA_RDS:
-                # Check for new RDS data available
-                result = False
-
-                self.write_bytes(bytes([RADIO_REG_RDSA]))
-
-                new_data = self.read16()
-                if new_data != self.registers[RADIO_REG_RDSA]:
-                    self.registers[RADIO_REG_RDSA] = new_data
-                    result = True
-
-                new_data = self.read16()
-                if new_data != self.registers[RADIO_REG_RDSB]:
-                    self.registers[RADIO_REG_RDSB] = new_data
-                    result = True
+        """Polls the chip for a new RDS group and hands it to the parser.
+
+        RA, RB and the four RDS blocks are fetched in a single bus transaction.
+        """
+        if (self.send_rds or self._capture is not None) and self.poll_rds():
+            if self._capture is not None:
+                self._record_group()
+            if self.send_rds:
+                self.send_rds(
+                    self.registers[RADIO_REG_RDSA],
+                    self.registers[RADIO_REG_RDSB],
+                    self.registers[RADIO_REG_RDSC],
+                    self.registers[RADIO_REG_RDSD],
+                    self.rds_bler,
+                )
+
+    def start_capture(self, stream):
+        """Records every RDS group received by check_rds to stream.
+
+        stream is anything with a ``write`` method, like a file opened in binary
+        mode. Each group is written as a fixed size record, see
+        :func:`replay_capture`.
+        """
+        self._capture = stream
+        self._capture_start = self.clock.monotonic()
+
+    def stop_capture(self):
+        """Stops recording RDS groups, the stream is left open."""
+        self._capture = None
+
+    def _record_group(self):
+        registers = self.registers
+        elapsed = int((self.clock.monotonic() - self._capture_start) * 1000)
+        struct.pack_into(
+            CAPTURE_RECORD_FORMAT,
+            self._record,
+            0,
+            elapsed & 0xFFFFFFFF,
+            self.frequency,
+            registers[RADIO_REG_RB] >> 10,
+            self.rds_bler,
+            registers[RADIO_REG_RDSA],
+            registers[RADIO_REG_RDSB],
+            registers[RADIO_REG_RDSC],
+            registers[RADIO_REG_RDSD],
+        )
+        self._capture.write(self._record)
 
-                new_data = self.read16()
-                if new_data != self.registers[RADIO_REG_RDSC]:
-                    self.registers[RADIO_REG_RDSC] = new_data
-                    result = True
+    def poll_rds(self):
+        """Reads the chip once, returns True if a new RDS group was received.
 
-                new_data = self.read16()
-                if new_data != self.registers[RADIO_REG_RDSD]:
-                    self.registers[RADIO_REG_RDSD] = new_data
+        The group is then in registers RADIO_REG_RDSA to RADIO_REG_RDSD, and its
+        block error levels in ``rds_bler``: BLERA in bits 2-3, BLERB in bits 0-1,
+        each from 0 (no errors) to 3 (uncorrectable). A group repeating the last
+        one counts as new only if it comes with fewer block errors.
+        """
+        # Check for rds data
+        self.check_threshold()
+        if not self.rds_ready:
+            return False
+        buf = self._read_status()
+        self.registers[RADIO_REG_RA] = (buf[0] << 8) | buf[1]
+        self.registers[RADIO_REG_RB] = (buf[2] << 8) | buf[3]
+        # The rssi comes with the status, no separate check is needed
+        self._track_rssi(buf[2] >> 2)
+
+        # Check for new RDS data available, skipping E blocks (paging data)
+        result = False
+        if (
+            self.registers[RADIO_REG_RA] & RADIO_REG_RA_RDS
+            and not self.registers[RADIO_REG_RB] & RADIO_REG_RB_ABCD_E
+        ):
+            for i in range(2, 6):
+                new_data = (buf[2 * i] << 8) | buf[2 * i + 1]
+                if new_data != self.registers[RADIO_REG_RA + i]:
+                    self.registers[RADIO_REG_RA + i] = new_data
                     result = True
-
-                if result:
-                    self.send_rds(
-                        self.registers[RADIO_REG_RDSA],
-                        self.registers[RADIO_REG_RDSB],
-                        self.registers[RADIO_REG_RDSC],
-                        self.registers[RADIO_REG_RDSD],
-                    )
+            bler = self.registers[RADIO_REG_RB] & (
+                RADIO_REG_RB_BLERA | RADIO_REG_RB_BLERB
+            )
+            # A copy of the last group with fewer block errors is new as well,
+            # the parser may have rejected the last one. BLERB weighs most
+            if ((bler & RADIO_REG_RB_BLERB) << 2 | bler >> 2) < (
+                (self.rds_bler & RADIO_REG_RB_BLERB) << 2 | self.rds_bler >> 2
+            ):
+                result = True
+            if result:
+                self.rds_bler = bler
+        return result
 
     def check_threshold(self):
-        """docstring."""
-        # Check every interval if the signal strength is strong enough for receiving rds data
-        current_time = time.monotonic()
-        if (current_time - self.initial) > self.interval:
-            if self.get_rssi() >= self.rds_threshold:
-                self.rds_ready = True
-            else:
-                self.rds_ready = False
+        """Checks the rssi while rds is off, to know when it can be read again.
+
+        While rds is read the rssi comes with every status read instead. The
+        time between checks drops to ``interval_min`` when the signal changes,
+        and doubles up to ``interval_max`` while it is stable.
+        """
+        if self.rds_ready:
+            return
+        current_time = self.clock.monotonic()
+        if (current_time - self.initial) > self.rssi_interval:
+            self._track_rssi(self.get_rssi())
             self.initial = current_time
 
     def get_rssi(self):
@@ -459,6 +972,61 @@ class Radio:
         self.write_bytes(
             bytes([reg_num, reg_val_1, reg_val_2])
         )  # reg_num is a register address
+        self._chip_registers[reg_num] = reg_val
+        self._dirty = self._dirty & ~(1 << reg_num)
+
+    def update_register(self, reg_num):
+        """Writes a changed shadow register to the chip.
+
+        Nothing is written if the chip already holds the value. Inside
+        :meth:`batch` the write is deferred until the batch ends.
+        """
+        if self.registers[reg_num] != self._chip_registers[reg_num]:
+            self._dirty = self._dirty | (1 << reg_num)
+        if not self._batch_depth:
+            self.flush()
+
+    def write_register(self, reg_num):
+        """Writes a shadow register to the chip now, along with pending changes.
+
+        Used for writes that start an action on the chip, such as a tune or seek,
+        which must not be skipped or deferred.
+        """
+        self._dirty = self._dirty | (1 << reg_num)
+        self.flush()
+
+    def flush(self):
+        """Writes all modified shadow registers to the chip.
+
+        The registers from the lowest to the highest modified one go out in a
+        single transaction, unmodified ones in between are rewritten unchanged.
+        """
+        dirty = self._dirty
+        if not dirty:
+            return
+        first = RADIO_REG_CTRL
+        while not dirty & (1 << first):
+            first += 1
+        last = len(self._chip_registers) - 1
+        while not dirty & (1 << last):
+            last -= 1
+        if first == last:
+            self.save_register(first)
+        else:
+            self.save_register_range(first, last)
+
+    def batch(self):
+        """Returns a context manager that collects register changes.
+
+        Setter calls inside ``with radio.batch():`` only update the shadow
+        registers, the changed registers are flushed once the block exits::
+
+            with radio.batch():
+                radio.set_mute(False)
+                radio.set_volume(5)
+                radio.set_bass_boost(False)
+        """
+        return self._batch
 
     def write_bytes(self, values):
         """docstring."""
@@ -467,8 +1035,41 @@ class Radio:
 
     def save_registers(self):
         """docstring."""
-        for i in range(2, 7):
-            self.save_register(i)
+        self.save_register_range(RADIO_REG_CTRL, 6)
+
+    def save_register_range(self, first, last):
+        """Writes shadow registers first..last (at most 2..7) in one I2C transaction.
+
+        Ranges starting at RADIO_REG_CTRL go to the chip's sequential access address
+        when a ``sequential`` device is set. Otherwise the burst starts with
+        ``first`` as register address on the random access device and relies on the
+        chip's register address auto-increment.
+        """
+        buf = self._write_buffer
+        buf[0] = first
+        end = 1
+        for i in range(first, last + 1):
+            buf[end] = self.registers[i] >> 8
+            buf[end + 1] = self.registers[i] & 255
+            end += 2
+            self._chip_registers[i] = self.registers[i]
+            self._dirty = self._dirty & ~(1 << i)
+        if self.sequential is not None and first == RADIO_REG_CTRL:
+            with self.sequential:
+                self.sequential.write(buf, start=1, end=end)
+        else:
+            with self.board:
+                self.board.write(buf, end=end)
+
+    def read_register(self, reg_num):
+        """Reads one register from the chip into its shadow register."""
+        buf = self._read_buffer
+        with self.board:
+            self.board.write_then_readinto(bytes([reg_num]), buf, in_end=2)
+        self.registers[reg_num] = (buf[0] << 8) | buf[1]
+        if reg_num < len(self._chip_registers):
+            self._chip_registers[reg_num] = self.registers[reg_num]
+        return self.registers[reg_num]
 
     def read16(self):
         """docstring."""
@@ -480,42 +1081,159 @@ class Radio:
 
     def read_registers(self):
         """docstring."""
-        # Reads register from chip to virtual memory
-        with self.board:
-            self.board.write(bytes([RADIO_REG_RA]))
-            for i in range(6):
-                self.registers[0xA + i] = self.read16()
+        # Reads registers RA to RDSD from chip to virtual memory
+        buf = self._read_status()
+        for i in range(6):
+            self.registers[RADIO_REG_RA + i] = (buf[2 * i] << 8) | buf[2 * i + 1]
+
+    def _read_status(self, end=12):
+        # Reads registers RA to RDSD, or the first end bytes of them, into the
+        # preallocated buffer in one transaction
+        buf = self._read_buffer
+        if self.sequential is not None:
+            # Sequential reads always start at RADIO_REG_RA
+            with self.sequential:
+                self.sequential.readinto(buf, end=end)
+        else:
+            with self.board:
+                self.board.write_then_readinto(self._read_address, buf, in_end=end)
+        return buf
+
+    def _read_ra_rb(self):
+        # Reads the status registers RA and RB in one transaction
+        buf = self._read_status(4)
+        self.registers[RADIO_REG_RA] = (buf[0] << 8) | buf[1]
+        self.registers[RADIO_REG_RB] = (buf[2] << 8) | buf[3]
+
+
+class _Batch:
+    # Context manager returned by Radio.batch(), batches may be nested
+    # pylint: disable=protected-access
+
+    def __init__(self, radio):
+        self.radio = radio
+
+    def __enter__(self):
+        self.radio._batch_depth += 1
+        return self.radio
 
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.radio._batch_depth -= 1
+        if not self.radio._batch_depth:
+            self.radio.flush()
+        return False
 
-def replace_element(index, text, newchar):
-    """docstring."""
-    # Replaces char in string at index with newchar
-    newlist = list(text)
-    if isinstance(newchar, int):
-        newlist[index] = " "
-        # this used to be an AND but that would make no sense. Changed to OR
-        if newchar < 127 or newchar > 31:
-            newlist[index] = chr(newchar)
-    else:
-        newlist[index] = newchar
-    return "".join(newlist)
+
+class Seek:
+    # pylint: disable=too-many-instance-attributes
+    """
+    A seek in progress, as returned by :meth:`Radio.start_seek`.
+
+    Call :meth:`poll` from the main loop until it returns True, then read
+    ``frequency`` and ``rssi``. ``failed`` is set when the chip reported a seek
+    failure (band limit reached without finding a station) or the seek timed out.
+    """
+
+    def __init__(self, radio, timeout):
+        self.radio = radio
+        self.timeout = timeout
+        self.start = radio.clock.monotonic()
+        self.elapsed = None
+        self.done = False
+        self.failed = False
+        self.cancelled = False
+        # Landed station
+        self.frequency = None
+        self.rssi = None
+
+    def poll(self):
+        """Checks the seek status once, returns True once the seek is over."""
+        if self.done:
+            return True
+        radio = self.radio
+        radio._read_ra_rb()  # pylint: disable=protected-access
+        if radio.registers[RADIO_REG_RA] & RADIO_REG_RA_STC:
+            self.failed = bool(radio.registers[RADIO_REG_RA] & RADIO_REG_RA_SF)
+            self._finish()
+        elif radio.clock.monotonic() - self.start >= self.timeout:
+            self.failed = True
+            self._finish()
+        return self.done
+
+    def is_done(self):
+        """Returns True once the seek has completed, failed or been cancelled."""
+        return self.done
+
+    def cancel(self):
+        """Stops the seek, leaving the radio on whatever channel it reached."""
+        if not self.done:
+            self.cancelled = True
+            self._finish()
+
+    def result(self):
+        """Returns the landed (frequency, rssi), or None while still seeking."""
+        if not self.done:
+            return None
+        return (self.frequency, self.rssi)
+
+    def _finish(self):
+        self.radio.end_seek()
+        self.elapsed = self.radio.clock.monotonic() - self.start
+        self.frequency = self.radio.frequency
+        self.rssi = self.radio.rssi
+        self.done = True
+
+
+def _printable(char):
+    # Maps characters outside printable ASCII to a space
+    if 31 < char < 127:
+        return char
+    return 0x20
+
+
+# Fill patterns used to reset the RDS text buffers in place
+_BLANK_TEXT = b" " * 66
+_BLANK_PS = b"        "
+_UNKNOWN_PS = b"--------"
+_NO_HITS = bytes(16)
+_TEXT_LENGTH = 64
 
 
 class RDSParser:
     # pylint: disable=too-many-instance-attributes
-    # pylint: disable=too-many-branches
-    # pylint: disable=too-many-statements
     """
     A class used for parsing rds data into readable strings
+
+    Station name and radio text are assembled in place in preallocated
+    bytearrays, strings are only created when read or when a callback fires.
+    Each segment must be received ``ps_confirmations`` or ``text_confirmations``
+    times in a row, and the name or text is published as soon as every segment
+    up to the end of text marker (0x0D) is confirmed.
+    Groups are dispatched through a 32 entry table indexed by group type and
+    version, so unhandled group types cost a single lookup.
     """
 
     def __init__(self):
         # RDS Values
-        self.rds_group_type = None
+        self.rds_group_type = None  # Group type * 2 + version, 0 for 0A, 1 for 0B
+        # Programme identification
+        self.rds_pi = None
         # Traffic programme
         self.rds_tp = None
         # Program type
         self.rds_pty = None
+        # Traffic announcement and music/speech switch
+        self.rds_ta = None
+        self.rds_ms = None
+        # Alternative frequencies, in 10 kHz units
+        self.alt_freqs = []
+        # Programme item number and extended country code
+        self.pin = None
+        self.ecc = None
+        # Open data applications, application ID by group type
+        self.oda = {}
+        # Other networks, station name by PI code
+        self.eon = {}
         # RDS text chars get stored here
         self.text_ab = None
         self.last_text_ab = None
@@ -524,24 +1242,89 @@ class RDSParser:
         self.last_minutes_2 = 0
         # Previous index
         self.last_text_idx = 0
+        # Times a segment must be received unchanged before it is used
+        self.ps_confirmations = 2
+        self.text_confirmations = 1
+        # Groups with more block errors are rejected, from 0 (none) to 3 (all)
+        self.max_bler_a = 2  # Above this, the PI code in block A is ignored
+        self.max_bler_b = 1  # Above this, the whole group is rejected
+        self.groups_accepted = 0
+        self.groups_rejected = 0
         # Functions initialization
         self.send_service_name = None
         self.send_text = None
         self.send_time = None
         # Radio text
-        self.rds_text = " " * 66
+        self._rds_text = bytearray(_BLANK_TEXT)
         # Station names
-        self.ps_name1 = "--------"
-        self.ps_name2 = self.ps_name1
-        self.program_service_name = "        "
+        self._ps_name1 = bytearray(_UNKNOWN_PS)
+        self._ps_name2 = bytearray(_UNKNOWN_PS)
+        self._program_service_name = bytearray(_BLANK_PS)
+        # Programme type name
+        self._ptyn = bytearray(_BLANK_PS)
+        self._ptyn_ab = None
+        # Times each segment was received unchanged, and bitmaps of the
+        # confirmed segments
+        self._ps_hits = bytearray(4)
+        self._ps_segments = 0
+        self._text_hits = bytearray(16)
+        self._text_segments = 0
+        self._text_length = _TEXT_LENGTH  # Position of the end of text marker
+        self._text_published = False
+
+        # Group handlers indexed by block2 >> 11
+        handlers = [self._group_ignore] * 32
+        handlers[0x00] = self._group_0  # 0A
+        handlers[0x01] = self._group_0  # 0B
+        handlers[0x02] = self._group_1a
+        handlers[0x04] = self._group_2  # 2A
+        handlers[0x05] = self._group_2  # 2B
+        handlers[0x06] = self._group_3a
+        handlers[0x08] = self._group_4a
+        handlers[0x14] = self._group_10a
+        handlers[0x1C] = self._group_14a
+        handlers[0x1F] = self._group_15b
+        self._handlers = handlers
 
     def init(self):
         """docstring."""
-        self.rds_text = " " * 66
-        self.ps_name1 = "--------"
-        self.ps_name2 = self.ps_name1
-        self.program_service_name = "        "
+        self._rds_text[:] = _BLANK_TEXT
+        self._ps_name1[:] = _UNKNOWN_PS
+        self._ps_name2[:] = _UNKNOWN_PS
+        self._program_service_name[:] = _BLANK_PS
+        self._ptyn[:] = _BLANK_PS
         self.last_text_idx = 0
+        self._ps_hits[:] = _NO_HITS[:4]
+        self._ps_segments = 0
+        self._clear_text()
+        self.alt_freqs = []
+        self.oda = {}
+        self.eon = {}
+
+    @property
+    def rds_text(self):
+        """The radio text assembled so far, up to its end marker."""
+        return self._rds_text[: self._text_length].decode()
+
+    @property
+    def ps_name1(self):
+        """Station name characters as last received."""
+        return self._ps_name1.decode()
+
+    @property
+    def ps_name2(self):
+        """Station name characters received twice in a row."""
+        return self._ps_name2.decode()
+
+    @property
+    def program_service_name(self):
+        """The last published station name."""
+        return self._program_service_name.decode()
+
+    @property
+    def ptyn(self):
+        """The programme type name (group 10A) received so far."""
+        return self._ptyn.decode()
 
     def attach_service_name_callback(self, new_function):
         """docstring."""
@@ -555,11 +1338,22 @@ class RDSParser:
         """docstring."""
         self.send_time = new_function
 
-    def process_data(self, block1, block2, block3, block4):
-        """docstring."""
+    def process_data(self, block1, block2, block3, block4, bler=0):
+        """Decodes one RDS group.
+
+        bler holds the block error levels as read from register RB, BLERA in bits
+        2-3 and BLERB in bits 0-1. Groups with too many errors in block B are
+        counted in ``groups_rejected`` and dropped before decoding.
+        """
+        # pylint: disable=too-many-arguments
+        if bler & RADIO_REG_RB_BLERB > self.max_bler_b:
+            self.groups_rejected += 1
+            return 0
+        self.groups_accepted += 1
+        pi_valid = bler >> 2 <= self.max_bler_a
 
         # Analyzing block 1
-        if block1 == 0:
+        if block1 == 0 and pi_valid:
             # If block1 set to zero, reset all RDS info
             self.init()
             if self.send_service_name:
@@ -569,77 +1363,499 @@ class RDSParser:
             return 0
 
         # Block 2
-        rds_group_type = 0x0A | ((block2 & 0xF000) >> 8) | ((block2 & 0x0800) >> 11)
+        self.rds_group_type = block2 >> 11
+        if pi_valid:
+            self.rds_pi = block1
         self.rds_tp = block2 & 0x0400
-        self.rds_pty = block2 & 0x0400
-
-        if rds_group_type == 0x0B:
-            # Data received is part of Service Station name
-            idx = 2 * (block2 & 0x0003)
-
-            cdata_1 = block4 >> 8
-            cdata_2 = block4 & 0x00FF
-
-            # Check that the data was successfuly received
-            if (self.ps_name1[idx] == cdata_1) and (self.ps_name1[idx + 1] == cdata_2):
-                self.ps_name2 = replace_element(idx, self.ps_name2, cdata_1)
-                self.ps_name2 = replace_element(idx + 1, self.ps_name2, cdata_2)
-                if (
-                    idx == 6
-                    and self.ps_name2 == self.ps_name1
-                    and self.program_service_name != self.ps_name2
-                ):
-                    # Publish station name
-                    self.program_service_name = self.ps_name2
-                    if self.send_service_name:
-                        self.send_service_name(self.program_service_name)
-
-            if (self.ps_name1[idx] != cdata_1) or (self.ps_name1[idx + 1] != cdata_2):
-                self.ps_name1 = replace_element(idx, self.ps_name1, cdata_1)
-                self.ps_name1 = replace_element(idx + 1, self.ps_name1, cdata_2)
-
-        elif rds_group_type == 0x2A:
-            time.sleep(0.1)
-            self.text_ab = block2 & 0x0010
-            idx = 4 * (block2 & 0x000F)
-            if idx < self.last_text_idx and self.send_text:
-                self.send_text(self.rds_text)
-            self.last_text_idx = idx
-
-            if self.text_ab != self.last_text_ab:
-                # Clear buffer
-                self.last_text_ab = self.text_ab
-                self.rds_text = " " * 66
-
-            self.rds_text = replace_element(idx, self.rds_text, block3 >> 8)
-            idx += 1
-            self.rds_text = replace_element(idx, self.rds_text, block3 & 0x00FF)
-            idx += 1
-            self.rds_text = replace_element(idx, self.rds_text, block4 >> 8)
-            idx += 1
-            self.rds_text = replace_element(idx, self.rds_text, block4 & 0x00FF)
-            idx += 1
-        elif rds_group_type == 0x4A:
-            time.sleep(0.1)
-            off = (block4) & 0x3F
-            mins = (block4 >> 6) & 0x3F
-            mins += 60 * (((block3 & 0x0001) << 4) | ((block4 >> 12) & 0x0F))
-            if off & 0x20:
-                mins -= 30 * (off & 0x1F)
-            else:
-                mins += 30 * (off & 0x1F)
-
-            # Check if function sendTime was set, and chek if the time is different from last time
-            if (self.send_time) and (mins != self.last_minutes_1):
-                # Checks if time appeared in the last two instances - To avoid noise
-                if (
-                    self.last_minutes_1 + 1 == mins
-                    or self.last_minutes_2 + 1 == mins
-                    or self.last_minutes_1 == 0
-                    or self.last_minutes_2 == 0
-                ):
-                    self.last_minutes_2 = self.last_minutes_1
-                    self.last_minutes_1 = mins
-                    self.send_time(mins // 60, mins % 60)
+        self.rds_pty = (block2 >> 5) & 0x1F
 
+        self._handlers[self.rds_group_type](block2, block3, block4)
         return 0
+
+    def _group_ignore(self, _block2, _block3, _block4):
+        pass
+
+    def _group_0(self, block2, block3, block4):
+        # Basic tuning and switching: station name, TA/MS and, in 0A, AF codes
+        self.rds_ta = block2 & 0x0010
+        self.rds_ms = block2 & 0x0008
+        if not block2 & 0x0800:
+            self._add_af(block3 >> 8)
+            self._add_af(block3 & 0x00FF)
+
+        # Data received is part of Service Station name
+        segment = block2 & 0x0003
+        idx = 2 * segment
+
+        cdata_1 = _printable(block4 >> 8)
+        cdata_2 = _printable(block4 & 0x00FF)
+        ps_name1 = self._ps_name1
+        ps_name2 = self._ps_name2
+        hits = self._ps_hits
+
+        # Count how many times in a row the segment was received
+        if (ps_name1[idx] == cdata_1) and (ps_name1[idx + 1] == cdata_2):
+            if hits[segment] < 255:
+                hits[segment] += 1
+        else:
+            ps_name1[idx] = cdata_1
+            ps_name1[idx + 1] = cdata_2
+            hits[segment] = 1
+        if hits[segment] >= self.ps_confirmations:
+            ps_name2[idx] = cdata_1
+            ps_name2[idx + 1] = cdata_2
+            self._ps_segments |= 1 << segment
+        else:
+            self._ps_segments &= ~(1 << segment)
+
+        if self._ps_segments == 0x0F and self._program_service_name != ps_name2:
+            # Publish station name
+            self._program_service_name[:] = ps_name2
+            if self.send_service_name:
+                self.send_service_name(self.program_service_name)
+
+    def _add_af(self, code):
+        # AF codes 1 to 204 are 87.6 to 107.9 MHz, others are list markers
+        if 0 < code < 205:
+            freq = 8750 + code * 10
+            if freq not in self.alt_freqs and len(self.alt_freqs) < 25:
+                self.alt_freqs.append(freq)
+
+    def _group_1a(self, _block2, block3, block4):
+        # Programme item number, extended country code in slow labelling variant 0
+        self.pin = block4
+        if not block3 & 0x7000:
+            self.ecc = block3 & 0x00FF
+
+    def _group_2(self, block2, block3, block4):
+        # Radio text, 4 characters per 2A group and 2 per 2B group
+        self.text_ab = block2 & 0x0010
+        segment = block2 & 0x000F
+        size = 2 if block2 & 0x0800 else 4
+        idx = size * segment
+        self.last_text_idx = idx
+
+        if self.text_ab != self.last_text_ab:
+            # Clear buffer
+            self.last_text_ab = self.text_ab
+            self._clear_text()
+
+        changed = self._put_segment(idx, size, block3, block4)
+
+        # Count how many times in a row the segment was received
+        hits = self._text_hits
+        if changed and hits[segment]:
+            # A segment changed after it was received, so a new message started
+            # without the A/B flag flipping. The other segments hold the old
+            # one until they are received again, and its end marker is stale
+            hits[:] = _NO_HITS
+            self._text_segments = 0
+            self._text_length = _TEXT_LENGTH
+            self._put_segment(idx, size, block3, block4)
+        if changed:
+            hits[segment] = 1
+            self._text_published = False
+        elif hits[segment] < 255:
+            hits[segment] += 1
+        if hits[segment] >= self.text_confirmations:
+            self._text_segments |= 1 << segment
+        else:
+            self._text_segments &= ~(1 << segment)
+
+        # Publish once every segment up to the end marker is confirmed
+        needed = (2 << min(self._text_length // size, 15)) - 1
+        if not self._text_published and self._text_segments & needed == needed:
+            self._text_published = True
+            if self.send_text:
+                self.send_text(self.rds_text)
+
+    def _put_segment(self, idx, size, block3, block4):
+        # Stores the characters of a 2A or 2B group, returns True if they changed
+        # 2B messages are at most 32 characters long
+        self._text_length = min(self._text_length, size << 4)
+        if size == 4:
+            changed = self._put_text(idx, block3)
+            return self._put_text(idx + 2, block4) or changed
+        return self._put_text(idx, block4)
+
+    def _put_text(self, idx, block):
+        # Stores two radio text characters, returns True if they changed
+        changed = self._put_char(idx, block >> 8)
+        return self._put_char(idx + 1, block & 0x00FF) or changed
+
+    def _put_char(self, idx, char):
+        if char == 0x0D:
+            self._text_length = min(idx, self._text_length)
+        elif idx == self._text_length:
+            # The end marker moved
+            self._text_length = _TEXT_LENGTH
+        char = _printable(char)
+        if self._rds_text[idx] == char:
+            return False
+        self._rds_text[idx] = char
+        return True
+
+    def _clear_text(self):
+        self._rds_text[:] = _BLANK_TEXT
+        self._text_hits[:] = _NO_HITS
+        self._text_segments = 0
+        self._text_length = _TEXT_LENGTH
+        self._text_published = False
+
+    def _group_3a(self, block2, _block3, block4):
+        # Open data application announcement: application ID by group type
+        self.oda[block2 & 0x001F] = block4
+
+    def _group_4a(self, _block2, block3, block4):
+        # Clock time
+        off = (block4) & 0x3F
+        mins = (block4 >> 6) & 0x3F
+        mins += 60 * (((block3 & 0x0001) << 4) | ((block4 >> 12) & 0x0F))
+        if off & 0x20:
+            mins -= 30 * (off & 0x1F)
+        else:
+            mins += 30 * (off & 0x1F)
+
+        # Check if function sendTime was set, and chek if the time is different from last time
+        if (self.send_time) and (mins != self.last_minutes_1):
+            # Checks if time appeared in the last two instances - To avoid noise
+            if (
+                self.last_minutes_1 + 1 == mins
+                or self.last_minutes_2 + 1 == mins
+                or self.last_minutes_1 == 0
+                or self.last_minutes_2 == 0
+            ):
+                self.last_minutes_2 = self.last_minutes_1
+                self.last_minutes_1 = mins
+                self.send_time(mins // 60, mins % 60)
+
+    def _group_10a(self, block2, block3, block4):
+        # Programme type name, two segments of 4 characters
+        if block2 & 0x0010 != self._ptyn_ab:
+            self._ptyn_ab = block2 & 0x0010
+            self._ptyn[:] = _BLANK_PS
+        idx = 4 * (block2 & 0x0001)
+        ptyn = self._ptyn
+        ptyn[idx] = _printable(block3 >> 8)
+        ptyn[idx + 1] = _printable(block3 & 0x00FF)
+        ptyn[idx + 2] = _printable(block4 >> 8)
+        ptyn[idx + 3] = _printable(block4 & 0x00FF)
+
+    def _group_14a(self, block2, block3, block4):
+        # Enhanced other networks, variants 0 to 3 carry the other station name
+        variant = block2 & 0x000F
+        if variant < 4:
+            name = self.eon.get(block4)
+            if name is None:
+                name = bytearray(_UNKNOWN_PS)
+                self.eon[block4] = name
+            name[2 * variant] = _printable(block3 >> 8)
+            name[2 * variant + 1] = _printable(block3 & 0x00FF)
+
+    def _group_15b(self, block2, _block3, _block4):
+        # Fast basic tuning and switching information
+        self.rds_ta = block2 & 0x0010
+        self.rds_ms = block2 & 0x0008
+
+
+# Band limits in kHz for each value of the RADIO_REG_CHAN_BAND bits
+_BAND_LIMITS = ((87000, 108000), (76000, 91000), (76000, 108000), (65000, 76000))
+# Channel spacing in kHz for each value of the RADIO_REG_CHAN_SPACE bits
+_CHANNEL_SPACINGS = (100, 200, 50, 25)
+
+
+def _check_channels(limits, spacing):
+    # The CHAN register holds channel numbers up to 1023, limits are in kHz
+    if (limits[1] - limits[0]) // spacing > RADIO_REG_RA_NR:
+        raise ValueError("Too many channels in the band for this spacing")
+
+
+# Radio.snapshot() blob: version, registers RADIO_REG_CTRL to RADIO_REG_VOL,
+# frequency and rds threshold
+_SNAPSHOT_FORMAT = ">B4HHB"
+_SNAPSHOT_SIZE = 12
+_SNAPSHOT_VERSION = 1
+
+
+class RadioGroup:
+    """
+    Drives several :class:`Radio` objects side by side, for example tuners on
+    different I2C buses or multiplexer channels
+
+    Each operation is started on every radio before any of them is waited on, so
+    the tuners work concurrently and a whole operation takes about as long as
+    on the slowest radio.
+    """
+
+    def __init__(self, radios):
+        self.radios = list(radios)
+
+    def tune(self, frequencies):
+        """Tunes each radio to the matching frequency, returns the tune latencies."""
+        for radio, freq in zip(self.radios, frequencies):
+            radio.start_tune(freq)
+        self._wait([radio.poll_tune for radio in self.radios])
+        return [radio.tune_latency for radio in self.radios]
+
+    def seek(self, upward=True):
+        """Seeks on all radios at once, returns the (frequency, rssi) of each."""
+        seeks = [radio.start_seek(upward) for radio in self.radios]
+        self._wait([seek.poll for seek in seeks])
+        return [seek.result() for seek in seeks]
+
+    def scan_band(self):
+        """Scans the band with the work split between the radios.
+
+        Each radio sweeps its own slice of the band, so the scan gets faster
+        with every receiver added. Returns the combined station table in the
+        format of :meth:`Radio.scan_band`, strongest first.
+        """
+        first = self.radios[0]
+        freqs = [radio.frequency for radio in self.radios]
+        step = first.spacing // 10 or 1
+        channels = (first.freq_high - first.freq_low) // step + 1
+        count = len(self.radios)
+        stations = []
+        scans = []
+        for i, radio in enumerate(self.radios):
+            low = first.freq_low + channels * i // count * step
+            high = first.freq_low + (channels * (i + 1) // count - 1) * step
+            scans.append(radio.scan_steps(low, high, stations))
+        while scans:
+            for scan in list(scans):
+                try:
+                    next(scan)
+                except StopIteration:
+                    scans.remove(scan)
+            first.clock.sleep(first.poll_interval)
+        self.tune(freqs)
+        stations.sort(key=lambda station: station[1], reverse=True)
+        return stations
+
+    def check_rds(self):
+        """Polls every radio for RDS data once."""
+        for radio in self.radios:
+            radio.check_rds()
+
+    def _wait(self, polls):
+        # Calls each poll function until all of them have returned True
+        clock = self.radios[0].clock
+        while True:
+            polls = [poll for poll in polls if not poll()]
+            if not polls:
+                return
+            clock.sleep(self.radios[0].poll_interval)
+
+
+class AsyncRadio:
+    """
+    asyncio interface to a :class:`Radio`
+
+    While waiting for the chip the coroutines await ``asyncio.sleep``, so other
+    tasks keep running during tuning, seeking and RDS polling.
+    """
+
+    def __init__(self, radio):
+        self.radio = radio
+
+    async def tune(self, freq):
+        """Tunes to freq, returns the tune latency or None on timeout."""
+        radio = self.radio
+        radio.start_tune(freq)
+        while not radio.poll_tune():
+            await asyncio.sleep(radio.poll_interval)
+        return radio.tune_latency
+
+    async def seek(self, upward=True):
+        """Seeks to the next station, returns its (frequency, rssi)."""
+        seek = self.radio.start_seek(upward)
+        while not seek.poll():
+            await asyncio.sleep(self.radio.poll_interval)
+        return seek.result()
+
+    async def soft_reset(self):
+        """Soft resets the chip."""
+        self.radio.set_reset(True)
+        await asyncio.sleep(2)
+        self.radio.set_reset(False)
+
+    def rds_groups(self, interval=0.02):
+        """Returns an async iterator of received RDS groups.
+
+        Use as ``async for group in radio.rds_groups():``, each group is a
+        (block1, block2, block3, block4, bler) tuple. The chip is polled every
+        interval seconds. Groups are not passed to the radio's parser, call
+        ``radio.send_rds(*group)`` to decode them.
+        """
+        return _RDSGroupStream(self.radio, interval)
+
+
+class _RDSGroupStream:
+    # Async iterator returned by AsyncRadio.rds_groups()
+
+    def __init__(self, radio, interval):
+        self.radio = radio
+        self.interval = interval
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        radio = self.radio
+        while not radio.poll_rds():
+            await asyncio.sleep(self.interval)
+        registers = radio.registers
+        return (
+            registers[RADIO_REG_RDSA],
+            registers[RADIO_REG_RDSB],
+            registers[RADIO_REG_RDSC],
+            registers[RADIO_REG_RDSD],
+            radio.rds_bler,
+        )
+
+
+# Kinds of RDSEvent, combine with | to subscribe to several
+EVENT_PS = 0x01  # Station name, value is a str
+EVENT_RT = 0x02  # Radio text, value is a str
+EVENT_CT = 0x04  # Clock time, value is an (hour, minute) tuple
+EVENT_PI = 0x08  # Programme identification code, value is an int
+EVENT_PTY = 0x10  # Programme type, value is an int
+EVENT_ALL = 0x1F
+
+# Events needing each group type to be decoded, by group type (block2 >> 12)
+_GROUP_EVENTS = (EVENT_PS, 0, EVENT_RT, 0, EVENT_CT, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0)
+
+
+class RDSEvent:
+    """A piece of decoded RDS data, kind is one of the EVENT_* constants."""
+
+    def __init__(self, kind, value):
+        self.kind = kind
+        self.value = value
+
+    def __repr__(self):
+        return f"RDSEvent({self.kind}, {self.value!r})"
+
+
+def rds_group_source(radio, interval=0.01):
+    """Generator of the raw RDS groups received by radio.
+
+    Yields (block1, block2, block3, block4, bler) tuples, polling the chip
+    every interval seconds while waiting for the next group. It never ends, stop
+    consuming it to stop polling.
+    """
+    registers = radio.registers
+    while True:
+        if radio.poll_rds():
+            yield (
+                registers[RADIO_REG_RDSA],
+                registers[RADIO_REG_RDSB],
+                registers[RADIO_REG_RDSC],
+                registers[RADIO_REG_RDSD],
+                radio.rds_bler,
+            )
+        else:
+            radio.clock.sleep(interval)
+
+
+def dedup_groups(groups, max_bler_b=1):
+    """Generator that drops repeated, empty and erroneous groups.
+
+    A group is dropped if its blocks repeat the group before, if block A is
+    zero, or if its BLERB level is above max_bler_b.
+    """
+    last = None
+    for group in groups:
+        if group[4] & RADIO_REG_RB_BLERB > max_bler_b or not group[0]:
+            continue
+        if group[:4] != last:
+            last = group[:4]
+            yield group
+
+
+def decode_groups(groups, kinds=EVENT_ALL):
+    """Generator decoding groups into :class:`RDSEvent` objects.
+
+    Only events of the kinds given as a mask of EVENT_* constants are produced,
+    groups that cannot produce any of them are skipped without being decoded.
+    PI and PTY events are produced when the value changes, from groups the
+    parser accepts under its block error limits.
+    """
+    parser = RDSParser()
+    events = []
+    if kinds & EVENT_PS:
+        parser.attach_service_name_callback(
+            lambda name: events.append(RDSEvent(EVENT_PS, name))
+        )
+    if kinds & EVENT_RT:
+        parser.attach_text_callback(
+            lambda text: events.append(RDSEvent(EVENT_RT, text))
+        )
+    if kinds & EVENT_CT:
+        parser.attach_time_callback(
+            lambda hour, minute: events.append(RDSEvent(EVENT_CT, (hour, minute)))
+        )
+    decoded = kinds & (EVENT_PS | EVENT_RT | EVENT_CT)
+    pi_code = None
+    pty = None
+    for block1, block2, block3, block4, bler in groups:
+        # Same block error limits as the parser: the group is dropped when
+        # block B is unreliable, and the PI code when block A is
+        if bler & RADIO_REG_RB_BLERB > parser.max_bler_b:
+            continue
+        if kinds & EVENT_PI and block1 != pi_code and bler >> 2 <= parser.max_bler_a:
+            pi_code = block1
+            yield RDSEvent(EVENT_PI, pi_code)
+        if kinds & EVENT_PTY and (block2 >> 5) & 0x1F != pty:
+            pty = (block2 >> 5) & 0x1F
+            yield RDSEvent(EVENT_PTY, pty)
+        if decoded & _GROUP_EVENTS[block2 >> 12]:
+            parser.process_data(block1, block2, block3, block4, bler)
+            while events:
+                yield events.pop(0)
+
+
+# RDS capture replay
+
+
+def replay_capture(source, send_rds, realtime=False, clock=None):
+    """Feeds RDS groups recorded by :meth:`Radio.start_capture` to send_rds.
+
+    source is the recorded bytes or a file opened in binary mode, send_rds is
+    called like ``RDSParser.process_data`` with the four blocks and the block
+    error levels. Groups are replayed as fast as possible, or with their
+    recorded timing if realtime is True. Returns the number of groups replayed.
+    """
+    clock = clock if clock is not None else Clock()
+    start = clock.monotonic()
+    if hasattr(source, "readinto"):
+        # Read the file in chunks, a record split between two reads is carried
+        # over to the start of the buffer
+        view = memoryview(bytearray(CAPTURE_RECORD_SIZE * 64))
+        count = 0
+        filled = 0
+        while True:
+            size = source.readinto(view[filled:])
+            if not size:
+                return count
+            filled += size
+            whole = filled - filled % CAPTURE_RECORD_SIZE
+            if whole:
+                count += _replay_records(view[:whole], send_rds, realtime, clock, start)
+                view[: filled - whole] = view[whole:filled]
+                filled -= whole
+    return _replay_records(memoryview(source), send_rds, realtime, clock, start)
+
+
+def _replay_records(view, send_rds, realtime, clock, start):
+    # pylint: disable=too-many-arguments
+    count = len(view) // CAPTURE_RECORD_SIZE
+    for offset in range(0, count * CAPTURE_RECORD_SIZE, CAPTURE_RECORD_SIZE):
+        # elapsed ms, frequency, rssi, bler, block1, block2, block3, block4
+        record = struct.unpack_from(CAPTURE_RECORD_FORMAT, view, offset)
+        if realtime:
+            delay = record[0] / 1000 - (clock.monotonic() - start)
+            if delay > 0:
+                clock.sleep(delay)
+        send_rds(record[4], record[5], record[6], record[7], record[3])
+    return count
@@ -0,0 +1,360 @@
+# SPDX-FileCopyrightText: Copyright (c) 2022 tinkeringtech for TinkeringTech LLC
+#
+# SPDX-License-Identifier: MIT
+"""
+`tinkeringtech_rda5807m_emulator`
+================================================================================
+
+Software model of the rda5807m, to run the driver without radio hardware
+
+
+* Author(s): tinkeringtech
+
+Implementation Notes
+--------------------
+
+Meant for tests and benchmarks on a computer, it is kept out of
+:mod:`tinkeringtech_rda5807m` so that boards do not load it.
+"""
+
+from tinkeringtech_rda5807m import (
+    Clock,
+    RADIO_REG_CHAN,
+    RADIO_REG_CHAN_BAND,
+    RADIO_REG_CHAN_SPACE,
+    RADIO_REG_CHAN_TUNE,
+    RADIO_REG_CHIPID,
+    RADIO_REG_CTRL,
+    RADIO_REG_CTRL_ENABLE,
+    RADIO_REG_CTRL_MONO,
+    RADIO_REG_CTRL_RDS,
+    RADIO_REG_CTRL_RESET,
+    RADIO_REG_CTRL_SEEK,
+    RADIO_REG_CTRL_SEEKUP,
+    RADIO_REG_CTRL_SKMODE,
+    RADIO_REG_RA,
+    RADIO_REG_RA_NR,
+    RADIO_REG_RA_RDS,
+    RADIO_REG_RA_RDSS,
+    RADIO_REG_RA_SF,
+    RADIO_REG_RA_STC,
+    RADIO_REG_RA_STEREO,
+    RADIO_REG_RB,
+    RADIO_REG_RB_FMREADY,
+    RADIO_REG_RB_FMTRUE,
+    RADIO_REG_RDSA,
+    RADIO_REG_RDSD,
+    RADIO_REG_VOL,
+    _BAND_LIMITS,
+    _CHANNEL_SPACINGS,
+)
+
+
+class RDA5807MEmulator:
+    # pylint: disable=too-many-instance-attributes
+    """
+    A software model of the rda5807m register file for testing without hardware
+
+    It behaves like an I2C device on the chip's random access address and can
+    be passed to :class:`tinkeringtech_rda5807m.Radio` as ``board``, with
+    ``sequential`` standing in for the sequential access address. ``stations``
+    maps frequencies (in 10 kHz units, like ``Radio.frequency``) to their RSSI,
+    ``rds`` maps frequencies to lists of (block1, block2, block3, block4) groups
+    the station broadcasts in a loop. A group may have a fifth item, the block
+    error levels reported with it in RB.
+    """
+
+    # Chip timing - in seconds
+    tune_time = 0.02  # Tune to a channel
+    seek_step_time = 0.01  # Tune to and check one channel while seeking
+    rds_group_time = 0.0876  # Receive one RDS group, 104 bits at 1187.5 bit/s
+
+    # Band model
+    noise_floor = 2  # RSSI away from any station
+    rolloff = 10  # RSSI lost per 100 kHz of offset from a station
+    stereo_threshold = 25  # Minimum RSSI for stereo reception
+
+    # Register values after power-on and soft reset, by register, others are 0
+    reset_values = {RADIO_REG_CHIPID: 0x5804}
+
+    def __init__(self, stations=None, rds=None, clock=None):
+        self.stations = stations if stations is not None else {}
+        self.rds = rds if rds is not None else {}
+        self.clock = clock if clock is not None else Clock()
+        self.registers = [0] * 16
+        for reg, value in self.reset_values.items():
+            self.registers[reg] = value
+        # The chip as seen on the sequential access address
+        self.sequential = _SequentialPort(self)
+
+        # Statistics
+        self.transactions = 0
+        self.groups_sent = 0
+        self.groups_read = 0
+
+        self._pointer = 0
+        self._channel = 0
+        self._done_at = None  # When the running tune or seek completes
+        self._tuned_at = None  # When the current channel was reached
+        self._seek = None  # (start channel, step, landed channel, failed)
+        self._seek_started = 0
+        self._stc = False
+        self._sf = False
+        self._group = -1  # Index of the group in the RDS registers
+        self._bler = 0  # Block error levels of that group
+        self._rds_ready = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+    def write(self, buf, *, start=0, end=None):
+        """Writes a register address followed by any number of register values."""
+        self.transactions += 1
+        if end is None:
+            end = len(buf)
+        if end > start:
+            self._pointer = buf[start] & 0x0F
+            self._write_words(self._pointer, buf, start + 1, end)
+
+    def readinto(self, buf, *, start=0, end=None):
+        """Reads register values starting at the current register address."""
+        self.transactions += 1
+        self._read_words(self._pointer, buf, start, end)
+
+    def write_then_readinto(
+        self,
+        out_buffer,
+        in_buffer,
+        *,
+        out_start=0,
+        out_end=None,
+        in_start=0,
+        in_end=None
+    ):
+        """Sets the register address and reads back, in one transaction."""
+        # pylint: disable=too-many-arguments
+        self.write(out_buffer, start=out_start, end=out_end)
+        self._read_words(self._pointer, in_buffer, in_start, in_end)
+
+    def rssi_at(self, frequency):
+        """Returns the modelled RSSI at frequency, in kHz."""
+        best = self.noise_floor
+        for freq, rssi in self.stations.items():
+            level = rssi - abs(frequency - freq * 10) * self.rolloff // 100
+            best = max(best, level)
+        return min(best, 63)
+
+    def _band(self):
+        chan = self.registers[RADIO_REG_CHAN]
+        low, high = _BAND_LIMITS[(chan & RADIO_REG_CHAN_BAND) >> 2]
+        return low, high, _CHANNEL_SPACINGS[chan & RADIO_REG_CHAN_SPACE]
+
+    def _frequency(self, channel):
+        low, _, spacing = self._band()
+        return low + channel * spacing
+
+    def _is_station(self, frequency):
+        # A station the chip would stop on: on a 10 kHz grid and above SEEKTH
+        if frequency % 10 or frequency // 10 not in self.stations:
+            return False
+        threshold = (self.registers[RADIO_REG_VOL] >> 8) & 0x0F
+        return self.stations[frequency // 10] >= threshold
+
+    def _write_words(self, reg, buf, start, end):
+        for i in range(start, end - 1, 2):
+            self._write_register(reg, (buf[i] << 8) | buf[i + 1])
+            reg = (reg + 1) & 0x0F
+        self._pointer = reg
+
+    def _read_words(self, reg, buf, start, end):
+        if end is None:
+            end = len(buf)
+        self._update()
+        for i in range(start, end - 1, 2):
+            buf[i] = self.registers[reg] >> 8
+            buf[i + 1] = self.registers[reg] & 0xFF
+            if reg == RADIO_REG_RDSD and self._rds_ready:
+                # Reading the last block consumes the group
+                self._rds_ready = False
+                self.groups_read += 1
+            reg = (reg + 1) & 0x0F
+        self._pointer = reg
+
+    def _write_register(self, reg, value):
+        # pylint: disable=too-many-branches
+        now = self.clock.monotonic()
+        self._update(now)
+        old = self.registers[reg]
+        self.registers[reg] = value
+        if reg == RADIO_REG_CTRL:
+            if value & RADIO_REG_CTRL_RESET:
+                self._reset()
+                self.registers[RADIO_REG_CTRL] = value
+            elif not value & RADIO_REG_CTRL_ENABLE:
+                self._seek = None
+                self._stc = False
+            elif value & RADIO_REG_CTRL_SEEK and not old & RADIO_REG_CTRL_SEEK:
+                self._start_seek(now)
+            elif self._seek is not None and not value & RADIO_REG_CTRL_SEEK:
+                # Seek cancelled, stay on the channel reached so far
+                self._channel = self._seek_channel(now)
+                self._seek = None
+                self._done_at = None
+                self._tuned_at = now
+                self._group = -1
+        elif reg == RADIO_REG_CHAN and value & RADIO_REG_CHAN_TUNE:
+            # The chip clears the tune bit once it has taken the new channel
+            self.registers[reg] = value & ~RADIO_REG_CHAN_TUNE
+            if self.registers[RADIO_REG_CTRL] & RADIO_REG_CTRL_ENABLE:
+                low, high, spacing = self._band()
+                self._channel = min((value >> 6) & 0x3FF, (high - low) // spacing)
+                self._seek = None
+                self._start_busy(now, self.tune_time)
+
+    def _reset(self):
+        for i in range(16):
+            self.registers[i] = self.reset_values.get(i, 0)
+        self._channel = 0
+        self._seek = None
+        self._done_at = None
+        self._tuned_at = None
+        self._stc = False
+        self._sf = False
+        self._group = -1
+        self._rds_ready = False
+
+    def _start_busy(self, now, duration):
+        self._stc = False
+        self._sf = False
+        self._done_at = now + duration
+        self._tuned_at = None
+        self._group = -1
+        self._rds_ready = False
+
+    def _start_seek(self, now):
+        low, high, spacing = self._band()
+        channels = (high - low) // spacing + 1
+        ctrl = self.registers[RADIO_REG_CTRL]
+        step = 1 if ctrl & RADIO_REG_CTRL_SEEKUP else -1
+        channel = self._channel
+        steps = 0
+        failed = True
+        while True:
+            channel += step
+            if not 0 <= channel < channels:
+                if ctrl & RADIO_REG_CTRL_SKMODE:
+                    # Stop at the band limit
+                    channel -= step
+                    break
+                channel %= channels
+            steps += 1
+            if channel == self._channel:
+                # Searched the whole band
+                break
+            if self._is_station(low + channel * spacing):
+                failed = False
+                break
+        self._seek = (self._channel, step, channel, failed)
+        self._start_busy(now, max(steps, 1) * self.seek_step_time)
+        self._seek_started = now
+
+    def _seek_channel(self, now):
+        # Channel the running seek has reached by now
+        low, high, spacing = self._band()
+        channels = (high - low) // spacing + 1
+        start, step, _, _ = self._seek
+        steps = int((now - self._seek_started) / self.seek_step_time)
+        return (start + step * steps) % channels
+
+    def _update(self, now=None):
+        # pylint: disable=too-many-branches
+        # Advances the tune, seek and RDS state to the current time
+        if now is None:
+            now = self.clock.monotonic()
+        if self._done_at is not None and now >= self._done_at:
+            if self._seek is not None:
+                self._channel = self._seek[2]
+                self._sf = self._seek[3]
+                self._seek = None
+                self.registers[RADIO_REG_CTRL] &= ~RADIO_REG_CTRL_SEEK
+            self._stc = True
+            self._tuned_at = self._done_at
+            self._done_at = None
+
+        ctrl = self.registers[RADIO_REG_CTRL]
+        if not ctrl & RADIO_REG_CTRL_ENABLE:
+            self.registers[RADIO_REG_RA] = 0
+            self.registers[RADIO_REG_RB] = 0
+            return
+        channel = self._channel
+        if self._seek is not None:
+            channel = self._seek_channel(now)
+        frequency = self._frequency(channel)
+        rssi = self.rssi_at(frequency)
+        station = self._is_station(frequency)
+
+        streaming = (
+            self._tuned_at is not None
+            and ctrl & RADIO_REG_CTRL_RDS
+            and station
+            and frequency // 10 in self.rds
+        )
+        if streaming:
+            group = int((now - self._tuned_at) / self.rds_group_time) - 1
+            if group > self._group:
+                groups = self.rds[frequency // 10]
+                self.groups_sent += group - self._group
+                self._group = group
+                block = groups[group % len(groups)]
+                for i in range(4):
+                    self.registers[RADIO_REG_RDSA + i] = block[i]
+                self._bler = block[4] if len(block) > 4 else 0
+                self._rds_ready = True
+
+        reg_a = channel & RADIO_REG_RA_NR
+        if self._rds_ready:
+            reg_a |= RADIO_REG_RA_RDS
+        if self._stc:
+            reg_a |= RADIO_REG_RA_STC
+        if self._sf:
+            reg_a |= RADIO_REG_RA_SF
+        if streaming:
+            reg_a |= RADIO_REG_RA_RDSS
+        if rssi >= self.stereo_threshold and not ctrl & RADIO_REG_CTRL_MONO:
+            reg_a |= RADIO_REG_RA_STEREO
+        self.registers[RADIO_REG_RA] = reg_a
+        reg_b = (rssi << 10) | RADIO_REG_RB_FMREADY | self._bler
+        if station:
+            reg_b |= RADIO_REG_RB_FMTRUE
+        self.registers[RADIO_REG_RB] = reg_b
+
+
+class _SequentialPort:
+    # The emulator as seen on the chip's sequential access address, where writes
+    # start at RADIO_REG_CTRL and reads start at RADIO_REG_RA
+
+    def __init__(self, chip):
+        self.chip = chip
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+    def write(self, buf, *, start=0, end=None):
+        """Writes register values starting at RADIO_REG_CTRL."""
+        self.chip.transactions += 1
+        if end is None:
+            end = len(buf)
+        # pylint: disable=protected-access
+        self.chip._write_words(RADIO_REG_CTRL, buf, start, end)
+
+    def readinto(self, buf, *, start=0, end=None):
+        """Reads register values starting at RADIO_REG_RA."""
+        self.chip.transactions += 1
+        # pylint: disable=protected-access
+        self.chip._read_words(RADIO_REG_RA, buf, start, end)
@@ -0,0 +1,496 @@
+# SPDX-FileCopyrightText: Copyright (c) 2022 tinkeringtech for TinkeringTech LLC
+#
+# SPDX-License-Identifier: MIT
+"""
+`tinkeringtech_rda5807m_tools`
+================================================================================
+
+Host tools for the rda5807m driver: threaded RDS polling, I2C bus statistics
+and call profiling
+
+
+* Author(s): tinkeringtech
+
+Implementation Notes
+--------------------
+
+They run on a computer or a board with enough memory to spare, and are kept
+out of :mod:`tinkeringtech_rda5807m` so that other programs do not load them.
+"""
+
+import time
+
+
+class HarvestStats:
+    """Per-receiver counters kept by :class:`RDSHarvester`."""
+
+    def __init__(self):
+        self.polls = 0
+        self.groups = 0
+        # check_rds duration, including the wait for the bus lock - in seconds
+        self.latency_total = 0
+        self.latency_max = 0
+
+    @property
+    def latency_mean(self):
+        """Mean check_rds duration in seconds."""
+        if not self.polls:
+            return 0
+        return self.latency_total / self.polls
+
+
+class RDSHarvester:
+    """
+    Polls the RDS data of several radios from worker threads, on CPython hosts
+
+    Every radio gets its own thread. Radios sharing an I2C bus must be added with
+    the same ``bus`` key, their transactions are then serialized by one lock.
+    Decoded data is put on the ``events`` queue as (receiver, kind, value) tuples,
+    where receiver is the index returned by :meth:`add` and kind is "name",
+    "text" or "time". Callbacks already attached to a parser keep being called.
+    """
+
+    def __init__(self):
+        # pylint: disable=import-outside-toplevel
+        import queue
+        import threading
+
+        self._threading = threading
+        self.events = queue.Queue()
+        self.radios = []
+        self.stats = []
+        self._locks = {}
+        self._bus_locks = []
+        self._threads = []
+        self._running = False
+        self._started = 0
+        self._stopped = None
+
+    def add(self, radio, bus=None):
+        """Adds a radio, bus identifies its I2C bus. Returns its receiver index."""
+        if bus is None:
+            bus = id(radio)
+        if bus not in self._locks:
+            self._locks[bus] = self._threading.Lock()
+        index = len(self.radios)
+        stats = HarvestStats()
+        self.radios.append(radio)
+        self.stats.append(stats)
+        self._bus_locks.append(self._locks[bus])
+
+        parser = radio.rds_parser
+        parser.attach_service_name_callback(
+            self._forward(index, "name", parser.send_service_name)
+        )
+        parser.attach_text_callback(self._forward(index, "text", parser.send_text))
+        parser.attach_time_callback(self._forward(index, "time", parser.send_time))
+
+        send_rds = radio.send_rds
+
+        def count_group(*blocks):
+            stats.groups += 1
+            send_rds(*blocks)
+
+        radio.send_rds = count_group
+        return index
+
+    def _forward(self, index, kind, previous):
+        # Returns a callback that queues the decoded data, then calls previous
+        events = self.events
+
+        def callback(*value):
+            events.put((index, kind, value[0] if len(value) == 1 else value))
+            if previous:
+                previous(*value)
+
+        return callback
+
+    def start(self, interval=0.005):
+        """Starts polling every radio, sleeping interval seconds between polls."""
+        self._running = True
+        self._started = time.monotonic()
+        self._stopped = None
+        for index in range(len(self.radios)):
+            thread = self._threading.Thread(
+                target=self._poll, args=(index, interval), daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Stops polling and waits for the worker threads to finish."""
+        self._running = False
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self._stopped = time.monotonic()
+
+    def groups_per_second(self):
+        """Returns the RDS groups received per second over all radios."""
+        end = self._stopped if self._stopped is not None else time.monotonic()
+        elapsed = end - self._started
+        if elapsed <= 0:
+            return 0
+        return sum(stats.groups for stats in self.stats) / elapsed
+
+    def _poll(self, index, interval):
+        radio = self.radios[index]
+        lock = self._bus_locks[index]
+        stats = self.stats[index]
+        while self._running:
+            start = time.monotonic()
+            with lock:
+                radio.check_rds()
+            latency = time.monotonic() - start
+            stats.polls += 1
+            stats.latency_total += latency
+            stats.latency_max = max(stats.latency_max, latency)
+            time.sleep(interval)
+
+
+# Bus instrumentation
+
+
+def _wrap_methods(obj, names, wrap):
+    # Replaces each named method on the instance only with wrap(name, method),
+    # the class and other instances are left untouched. Returns what the
+    # instance held before, to be given to _unwrap_methods
+    own = getattr(obj, "__dict__", {})
+    saved = {}
+    for name in names:
+        saved[name] = own.get(name)
+        setattr(obj, name, wrap(name, getattr(obj, name)))
+    return saved
+
+
+def _unwrap_methods(obj, saved):
+    # Puts back the instance attributes replaced by _wrap_methods
+    for name, previous in saved.items():
+        if previous is None:
+            delattr(obj, name)
+        else:
+            setattr(obj, name, previous)
+
+
+class BusStats:
+    """I2C transactions made by one operation, kept by :class:`BusMonitor`."""
+
+    def __init__(self, buckets):
+        self.calls = 0
+        self.transactions = 0
+        self.bytes_written = 0
+        self.bytes_read = 0
+        # Transaction latency - in microseconds
+        self.latency_total = 0
+        self.latency_max = 0
+        # Transactions per latency bucket, the last one counts the slower ones
+        self.histogram = [0] * (len(buckets) + 1)
+
+    @property
+    def latency_mean(self):
+        """Mean transaction latency in microseconds."""
+        if not self.transactions:
+            return 0
+        return self.latency_total / self.transactions
+
+
+class BusMonitor:
+    """
+    Counts the I2C transactions of a :class:`tinkeringtech_rda5807m.Radio` per operation
+
+    :meth:`install` replaces the radio's ``board`` and ``sequential`` devices with
+    counting wrappers, and wraps the methods named in ``operations`` on the radio
+    instance so each transaction is charged to the outermost operation running.
+    Transactions made outside of them are charged to "other". :meth:`uninstall`
+    puts the radio back as it was, so it costs nothing when not installed.
+    """
+
+    # Upper bounds of the latency histogram buckets - in microseconds
+    BUCKETS = (100, 250, 500, 1000, 2500, 5000, 10000)
+    OPERATIONS = (
+        "setup",
+        "tune",
+        "set_freq",
+        "start_tune",
+        "poll_tune",
+        "seek_up",
+        "seek_down",
+        "start_seek",
+        "scan_band",
+        "check_rds",
+        "check_threshold",
+        "get_radio_info",
+        "set_band",
+        "set_spacing",
+        "set_volume",
+        "set_mute",
+        "set_soft_mute",
+        "set_mono",
+        "set_bass_boost",
+        "soft_reset",
+        "flush",
+    )
+
+    def __init__(self, radio, operations=OPERATIONS):
+        self.radio = radio
+        self.operations = operations
+        self.stats = {}
+        self._current = None
+        self._devices = None
+        self._saved = None
+
+    def install(self):
+        """Starts counting the radio's transactions."""
+        if self._devices is not None:
+            return
+        radio = self.radio
+        self._devices = (radio.board, radio.sequential)
+        radio.board = _CountingDevice(radio.board, self)
+        if radio.sequential is not None:
+            radio.sequential = _CountingDevice(radio.sequential, self)
+        self._saved = _wrap_methods(radio, self.operations, self._wrap)
+
+    def uninstall(self):
+        """Stops counting, the statistics are kept."""
+        if self._devices is None:
+            return
+        _unwrap_methods(self.radio, self._saved)
+        self.radio.board, self.radio.sequential = self._devices
+        self._devices = None
+
+    def reset(self):
+        """Clears the statistics."""
+        self.stats = {}
+
+    def dump(self):
+        """Prints the statistics, one line per operation."""
+        bounds = ", ".join(str(bound) for bound in self.BUCKETS)
+        print(
+            f"{'operation':16} {'calls':>6} {'trans':>6} {'written':>8} {'read':>8}"
+            f" {'mean us':>8} {'max us':>8}  histogram (us: {bounds}, more)"
+        )
+        for name in sorted(self.stats):
+            stats = self.stats[name]
+            histogram = " ".join(str(count) for count in stats.histogram)
+            print(
+                f"{name:16} {stats.calls:6} {stats.transactions:6}"
+                f" {stats.bytes_written:8} {stats.bytes_read:8}"
+                f" {stats.latency_mean:8.0f} {stats.latency_max:8}  {histogram}"
+            )
+
+    def _stats_for(self, name):
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = BusStats(self.BUCKETS)
+        return stats
+
+    def _wrap(self, name, method):
+        def operation(*args, **kwargs):
+            if self._current is not None:
+                return method(*args, **kwargs)
+            self._current = self._stats_for(name)
+            self._current.calls += 1
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._current = None
+
+        return operation
+
+    def _count(self, started, written, read):
+        latency = (time.monotonic_ns() - started) // 1000
+        stats = self._current
+        if stats is None:
+            stats = self._stats_for("other")
+        stats.transactions += 1
+        stats.bytes_written += written
+        stats.bytes_read += read
+        stats.latency_total += latency
+        stats.latency_max = max(stats.latency_max, latency)
+        bucket = 0
+        for bound in self.BUCKETS:
+            if latency <= bound:
+                break
+            bucket += 1
+        stats.histogram[bucket] += 1
+
+
+def _span(buf, start, end):
+    # Number of bytes between start and end in buf, end None meaning its length
+    return (len(buf) if end is None else end) - start
+
+
+class _CountingDevice:
+    # Passes I2C transactions through to device and reports them to monitor
+
+    def __init__(self, device, monitor):
+        self.device = device
+        self.monitor = monitor
+
+    def __enter__(self):
+        self.device.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return self.device.__exit__(exc_type, exc_val, exc_tb)
+
+    def write(self, buf, *, start=0, end=None):
+        """Writes buf[start:end] to the device."""
+        started = time.monotonic_ns()
+        self.device.write(buf, start=start, end=end)
+        # pylint: disable=protected-access
+        self.monitor._count(started, _span(buf, start, end), 0)
+
+    def readinto(self, buf, *, start=0, end=None):
+        """Reads into buf[start:end] from the device."""
+        started = time.monotonic_ns()
+        self.device.readinto(buf, start=start, end=end)
+        # pylint: disable=protected-access
+        self.monitor._count(started, 0, _span(buf, start, end))
+
+    def write_then_readinto(
+        self,
+        out_buffer,
+        in_buffer,
+        *,
+        out_start=0,
+        out_end=None,
+        in_start=0,
+        in_end=None
+    ):
+        """Writes out_buffer[out_start:out_end] then reads into in_buffer."""
+        # pylint: disable=too-many-arguments
+        started = time.monotonic_ns()
+        self.device.write_then_readinto(
+            out_buffer,
+            in_buffer,
+            out_start=out_start,
+            out_end=out_end,
+            in_start=in_start,
+            in_end=in_end,
+        )
+        # pylint: disable=protected-access
+        self.monitor._count(
+            started,
+            _span(out_buffer, out_start, out_end),
+            _span(in_buffer, in_start, in_end),
+        )
+
+
+# Profiling
+
+# Profiler names of RDS group decoding, by group type (block2 >> 11)
+_GROUP_NAMES = tuple(f"process_data {n >> 1}{'AB'[n & 1]}" for n in range(32))
+
+
+class CallStats:
+    """Wall time of the calls to one method, kept by :class:`Profiler`."""
+
+    def __init__(self):
+        self.calls = 0
+        # Call duration - in microseconds
+        self.time_total = 0
+        self.time_max = 0
+
+    @property
+    def time_mean(self):
+        """Mean call duration in microseconds."""
+        if not self.calls:
+            return 0
+        return self.time_total / self.calls
+
+
+class Profiler:
+    """
+    Times the calls to :class:`tinkeringtech_rda5807m.Radio` methods and RDS decoding
+
+    :meth:`install` wraps the methods named in ``methods`` on the radio instance,
+    and the radio's ``send_rds`` whose calls are timed per RDS group type, as
+    "process_data 2A" and so on. Nested calls are timed too, so check_rds
+    includes the process_data it makes. When set, ``pre(name)`` is called before
+    and ``post(name, elapsed)`` after every profiled call, elapsed being in
+    microseconds. :meth:`uninstall` puts the radio back as it was. With a
+    :class:`BusMonitor` on the same radio, uninstall them in reverse order.
+    """
+
+    METHODS = (
+        "tune",
+        "set_freq",
+        "seek_up",
+        "seek_down",
+        "check_rds",
+        "check_threshold",
+    )
+
+    def __init__(self, radio, methods=METHODS, pre=None, post=None):
+        self.radio = radio
+        self.methods = methods
+        self.pre = pre
+        self.post = post
+        self.stats = {}
+        self._saved = None
+        self._send_rds = None
+
+    def install(self):
+        """Starts timing the radio's calls."""
+        if self._saved is not None:
+            return
+        radio = self.radio
+        self._saved = _wrap_methods(radio, self.methods, self._wrap)
+        self._send_rds = send_rds = radio.send_rds
+
+        def process_data(block1, block2, block3, block4, bler=0):
+            # pylint: disable=too-many-arguments
+            return self._call(
+                _GROUP_NAMES[block2 >> 11],
+                send_rds,
+                (block1, block2, block3, block4, bler),
+                {},
+            )
+
+        radio.send_rds = process_data
+
+    def uninstall(self):
+        """Stops timing, the statistics are kept."""
+        if self._saved is None:
+            return
+        _unwrap_methods(self.radio, self._saved)
+        self.radio.send_rds = self._send_rds
+        self._saved = None
+
+    def reset(self):
+        """Clears the statistics."""
+        self.stats = {}
+
+    def dump(self):
+        """Prints the statistics, one line per method, slowest in total first."""
+        print(f"{'call':20} {'calls':>7} {'total ms':>10} {'mean us':>9} {'max us':>9}")
+        for name in sorted(self.stats, key=lambda name: -self.stats[name].time_total):
+            stats = self.stats[name]
+            print(
+                f"{name:20} {stats.calls:7} {stats.time_total / 1000:10.1f}"
+                f" {stats.time_mean:9.0f} {stats.time_max:9}"
+            )
+
+    def _wrap(self, name, method):
+        def profiled(*args, **kwargs):
+            return self._call(name, method, args, kwargs)
+
+        return profiled
+
+    def _call(self, name, method, args, kwargs):
+        if self.pre is not None:
+            self.pre(name)
+        started = time.monotonic_ns()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            elapsed = (time.monotonic_ns() - started) // 1000
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = CallStats()
+            stats.calls += 1
+            stats.time_total += elapsed
+            stats.time_max = max(stats.time_max, elapsed)
+            if self.post is not None:
+                self.post(name, elapsed)